@@ -0,0 +1,73 @@
+from uuid import UUID
+
+from .models import AudioStatus
+
+AUDIO_CACHE_TTL_SECONDS = 300
+AUDIOS_PAGE_CACHE_TTL_SECONDS = 60
+
+# Tags:
+#   audio:<id>                   every cached entry that contains this audio
+#   audios:head:<status>:<event> first page of a listing; new uploads land there
+#   audios:status:<status>       pages filtered by status (membership can change)
+#   audios:event:<event_id>      pages filtered by event (membership can change)
+
+
+def audio_tag(audio_id: UUID) -> str:
+    return f"audio:{audio_id}"
+
+
+def _filter_part(value: object | None) -> str:
+    return "*" if value is None else str(value)
+
+
+def detail_key(audio_id: UUID) -> str:
+    return f"audios:detail:{audio_id}"
+
+
+def page_key(
+    limit: int,
+    cursor: str | None,
+    status: AudioStatus | None,
+    event_id: UUID | None,
+) -> str:
+    return (
+        f"audios:page:{_filter_part(status)}:{_filter_part(event_id)}"
+        f":{cursor or 'head'}:{limit}"
+    )
+
+
+def page_tags(
+    audio_ids: list[UUID],
+    cursor: str | None,
+    status: AudioStatus | None,
+    event_id: UUID | None,
+) -> list[str]:
+    tags = [audio_tag(audio_id) for audio_id in audio_ids]
+    if cursor is None:
+        tags.append(f"audios:head:{_filter_part(status)}:{_filter_part(event_id)}")
+    if status is not None:
+        tags.append(f"audios:status:{status}")
+    if event_id is not None:
+        tags.append(f"audios:event:{event_id}")
+    return tags
+
+
+def created_tags(status: AudioStatus) -> list[str]:
+    # A new audio is the newest row, so only first pages can change
+    return ["audios:head:*:*", f"audios:head:{status}:*"]
+
+
+def status_changed_tags(
+    audio_id: UUID, old_status: AudioStatus, new_status: AudioStatus
+) -> list[str]:
+    return [
+        audio_tag(audio_id),
+        f"audios:status:{old_status}",
+        f"audios:status:{new_status}",
+    ]
+
+
+def attached_tags(audio_ids: list[UUID], event_id: UUID) -> list[str]:
+    return [audio_tag(audio_id) for audio_id in audio_ids] + [
+        f"audios:event:{event_id}"
+    ]
@@ -1,12 +1,16 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, File, Form, UploadFile
+from fastapi import APIRouter, File, Form, Header, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 
+from ..core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..core.redis import RedisClient
+from ..core.storage import BlobStore
 from ..database.database import DbSession
 from . import service
-from .schemas import AudioReadResponse
+from .models import AudioStatus
+from .schemas import AudioPageResponse, AudioReadResponse
 from src.auth.service import CurrentUser
 
 router = APIRouter(prefix="/audios", tags=["audios"])
@@ -17,18 +21,69 @@ async def create(
     db: DbSession,
     current_user: CurrentUser,
     redis: RedisClient,
+    storage: BlobStore,
     name: Annotated[str, Form(...)],
     file: Annotated[UploadFile, File(...)],
 ):
-    file_bytes = await file.read()
-    return service.create(db=db, redis=redis, name=name, file=file_bytes)
+    # Stream the spooled upload into blob storage chunk by chunk
+    blob = await run_in_threadpool(storage.put, file.file)
+    return await service.create(
+        db=db, redis=redis, name=name, blob=blob, content_type=file.content_type
+    )
 
 
-@router.get("/", response_model=list[AudioReadResponse])
-async def get_all(db: DbSession, redis: RedisClient, current_user: CurrentUser):
-    return service.get_all(db=db, redis=redis)
+@router.get("/", response_model=AudioPageResponse)
+async def get_all(
+    db: DbSession,
+    redis: RedisClient,
+    current_user: CurrentUser,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    status: AudioStatus | None = None,
+    event_id: UUID | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    return await service.get_all(
+        db=db,
+        redis=redis,
+        limit=limit,
+        cursor=cursor,
+        status=status,
+        event_id=event_id,
+        if_none_match=if_none_match,
+    )
 
 
 @router.get("/{audio_id}", response_model=AudioReadResponse)
-async def get_by_id(audio_id: UUID, db: DbSession, current_user: CurrentUser):
-    return service.get_by_id(db=db, audio_id=audio_id)
+async def get_by_id(
+    audio_id: UUID,
+    db: DbSession,
+    redis: RedisClient,
+    current_user: CurrentUser,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    return await service.get_by_id(
+        db=db, redis=redis, audio_id=audio_id, if_none_match=if_none_match
+    )
+
+
+@router.get("/{audio_id}/download")
+async def download(
+    audio_id: UUID,
+    db: DbSession,
+    storage: BlobStore,
+    current_user: CurrentUser,
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_range: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+):
+    return await service.download(
+        db=db,
+        storage=storage,
+        audio_id=audio_id,
+        range_header=range_header,
+        if_range=if_range,
+        if_none_match=if_none_match,
+        if_modified_since=if_modified_since,
+    )
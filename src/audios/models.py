@@ -1,9 +1,21 @@
-from sqlalchemy import Column, String, DateTime, UUID, Enum, Integer, ForeignKey
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    String,
+    DateTime,
+    UUID,
+    Enum,
+    Float,
+    Integer,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
 from datetime import datetime
 from enum import StrEnum
 from ..database.database import Base
 from uuid import uuid4
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.types import LargeBinary
 
 
@@ -19,14 +31,36 @@ class Audio(Base):
     id = Column(UUID, primary_key=True, index=True, default=uuid4)
     name = Column(String)
     status = Column(Enum(AudioStatus), default=AudioStatus.PENDING)
-    file = Column(LargeBinary, nullable=False)
-    event_id = Column(UUID, ForeignKey("events.id"), nullable=True, index=True)
+    blob_key = Column(String(64), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    content_type = Column(String, nullable=True)
+    sha256 = Column(String(64), nullable=True, index=True)
+    # Legacy inline storage, only set on rows uploaded before blob storage.
+    # Never loaded implicitly: use service.get_legacy_file to opt in.
+    file = deferred(Column(LargeBinary, nullable=True), raiseload=True)
+    event_id = Column(UUID, ForeignKey("events.id"), nullable=True)
+    # Processing progress: long uploads are fingerprinted in parallel segments
+    segments_total = Column(Integer, nullable=True)
+    segments_done = Column(Integer, nullable=False, default=0)
+    # Processing lease: the claiming task renews it while running and the
+    # sweeper requeues the audio once it lapses (crashed worker)
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    processing_attempts = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
 
     track_plays = relationship("TrackPlay", back_populates="audio")
     event = relationship("Event", back_populates="audios")
 
+    # Keyset pagination on (created_at, id), optionally filtered by status/event
+    __table_args__ = (
+        Index("ix_audios_created_at_id", "created_at", "id"),
+        Index("ix_audios_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_audios_event_id_created_at_id", "event_id", "created_at", "id"),
+        Index("ix_audios_status_lease_expires_at", "status", "lease_expires_at"),
+    )
+
     def __repr__(self):
         return f"Audio(id={self.id}, name={self.name}, status={self.status}, created_at={self.created_at}, updated_at={self.updated_at})"
 
@@ -39,8 +73,21 @@ class TrackPlay(Base):
     artist = Column(String, nullable=False)
     title = Column(String, nullable=False)
     duration = Column(Integer, nullable=False)
+    # Seconds into the uploaded audio where the track was first heard
+    start_offset = Column(Float, nullable=True)
+    confidence = Column(Float, nullable=True)
 
     audio = relationship("Audio", back_populates="track_plays")
 
+    # Natural key: processing retries upsert onto it instead of duplicating rows
+    __table_args__ = (
+        UniqueConstraint(
+            "audio_id",
+            "start_offset",
+            "title",
+            name="uq_track_plays_audio_id_start_offset_title",
+        ),
+    )
+
     def __repr__(self):
         return f"TrackPlay(id={self.id}, audio_id={self.audio_id}, artist={self.artist!r}, title={self.title!r}, duration={self.duration})"
@@ -10,12 +10,16 @@ class TrackPlayReadResponse(BaseModel):
     artist: str
     title: str
     duration: int
+    start_offset: float | None = None
+    confidence: float | None = None
 
 
 class AudioReadResponse(BaseModel):
     id: UUID
     name: str
     status: AudioStatus
+    # Percent of processing segments done, None before processing starts
+    progress: float | None = None
     event_id: UUID | None
     created_at: datetime
     updated_at: datetime
@@ -23,3 +27,8 @@ class AudioReadResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AudioPageResponse(BaseModel):
+    items: list[AudioReadResponse]
+    next_cursor: str | None
@@ -1,45 +1,45 @@
-import json
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
 from uuid import UUID, uuid4
 
-from redis import Redis
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import selectinload
 
+from ..core.kafka import AUDIOS_TOPIC
+from ..core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from ..core.responses import cached_json_response, etag_matches, pack_json
+from ..core.storage import BlobStorage, StoredBlob
 from ..database.database import DbSession
-from .models import Audio, AudioStatus
-from .schemas import AudioReadResponse, TrackPlayReadResponse
-from .tasks import process_audio
-from src.exceptions import AudioNotFoundError
-from src.core.redis import AUDIOS_LIST_CACHE_KEY, AUDIOS_LIST_CACHE_TTL_SECONDS
+from ..outbox import service as outbox
+from . import cache as audio_cache
+from .models import Audio, AudioStatus, TrackPlay
+from .schemas import AudioPageResponse, AudioReadResponse, TrackPlayReadResponse
+from src.exceptions import AudioNotFoundError, AudioRangeNotSatisfiableError
+from src.core.cache import get_or_build, invalidate_tags
 
+AUDIO_DOWNLOAD_CACHE_CONTROL = "private, max-age=86400"
+# By name, like the beat schedule: importing the task would load Celery
+PROCESS_AUDIO_TASK = "src.audios.tasks.process_audio"
 
-def create(db: DbSession, redis: Redis, name: str, file: bytes) -> AudioReadResponse:
-    audio = Audio(id=uuid4(), name=name, file=file, status=AudioStatus.PENDING)
-    db.add(audio)
-    db.commit()
-    db.refresh(audio)
 
-    response = AudioReadResponse(
-        id=audio.id,
-        name=audio.name,
-        status=audio.status,
-        event_id=audio.event_id,
-        created_at=audio.created_at,
-        updated_at=audio.updated_at,
-        track_plays=[],
-    )
-    process_audio.delay(str(audio.id))
-    redis.delete(AUDIOS_LIST_CACHE_KEY)
-    return response
-
-
-def get_by_id(db: DbSession, audio_id: UUID) -> AudioReadResponse:
-    audio = db.query(Audio).filter(Audio.id == audio_id).first()
-    if not audio:
-        raise AudioNotFoundError(audio_id)
+def _to_response(
+    audio: Audio, track_plays: list[TrackPlay] | None = None
+) -> AudioReadResponse:
+    if track_plays is None:
+        track_plays = audio.track_plays
     return AudioReadResponse(
         id=audio.id,
         name=audio.name,
         status=audio.status,
+        progress=(
+            100 * audio.segments_done / audio.segments_total
+            if audio.segments_total
+            else None
+        ),
         event_id=audio.event_id,
         created_at=audio.created_at,
         updated_at=audio.updated_at,
@@ -50,42 +50,265 @@ def get_by_id(db: DbSession, audio_id: UUID) -> AudioReadResponse:
                 artist=track_play.artist,
                 title=track_play.title,
                 duration=track_play.duration,
+                start_offset=track_play.start_offset,
+                confidence=track_play.confidence,
             )
-            for track_play in audio.track_plays
+            for track_play in track_plays
         ],
     )
 
 
-def get_all(db: DbSession, redis: Redis) -> list[AudioReadResponse]:
-    cached = redis.get(AUDIOS_LIST_CACHE_KEY)
-    if cached is not None:
-        return [AudioReadResponse.model_validate(obj) for obj in json.loads(cached)]
-
-    audios = db.query(Audio).options(selectinload(Audio.track_plays)).all()
-    responses = [
-        AudioReadResponse(
-            id=audio.id,
-            name=audio.name,
-            status=audio.status,
-            event_id=audio.event_id,
-            created_at=audio.created_at,
-            updated_at=audio.updated_at,
-            track_plays=[
-                TrackPlayReadResponse(
-                    id=track_play.id,
-                    audio_id=track_play.audio_id,
-                    artist=track_play.artist,
-                    title=track_play.title,
-                    duration=track_play.duration,
-                )
-                for track_play in audio.track_plays
-            ],
+async def create(
+    db: DbSession,
+    redis: Redis,
+    name: str,
+    blob: StoredBlob,
+    content_type: str | None = None,
+) -> AudioReadResponse:
+    audio = Audio(
+        id=uuid4(),
+        name=name,
+        content_type=content_type,
+        blob_key=blob.key,
+        size_bytes=blob.size,
+        sha256=blob.sha256,
+        status=AudioStatus.PENDING,
+    )
+    db.add(audio)
+    # Committed with the audio: a broker outage delays processing, never loses it
+    outbox.enqueue(db, PROCESS_AUDIO_TASK, str(audio.id))
+    outbox.record_event(
+        db,
+        AUDIOS_TOPIC,
+        "audio.created",
+        audio.id,
+        {
+            "audio_id": audio.id,
+            "name": audio.name,
+            "status": audio.status,
+            "content_type": audio.content_type,
+            "size_bytes": audio.size_bytes,
+            "sha256": audio.sha256,
+        },
+    )
+    await db.commit()
+
+    response = _to_response(audio, track_plays=[])
+    # Imported here: the Celery app and the processing code are only loaded
+    # by the first upload, not by every API process on startup
+    from ..outbox.tasks import kick_dispatcher
+
+    await run_in_threadpool(kick_dispatcher)
+    await invalidate_tags(redis, audio_cache.created_tags(audio.status))
+    return response
+
+
+async def _get_audio(
+    db: DbSession, audio_id: UUID, with_track_plays: bool = False
+) -> Audio:
+    query = select(Audio).where(Audio.id == audio_id)
+    if with_track_plays:
+        query = query.options(selectinload(Audio.track_plays))
+    audio = (await db.execute(query)).scalar_one_or_none()
+    if not audio:
+        raise AudioNotFoundError(audio_id)
+    return audio
+
+
+async def get_by_id(
+    db: DbSession, redis: Redis, audio_id: UUID, if_none_match: str | None = None
+) -> Response:
+    # Pydantic only runs when the cache is filled; hits return the stored bytes
+    async def build() -> tuple[str, list[str]]:
+        response = _to_response(await _get_audio(db, audio_id, with_track_plays=True))
+        return pack_json(response.model_dump_json()), [audio_cache.audio_tag(audio_id)]
+
+    entry = await get_or_build(
+        redis,
+        audio_cache.detail_key(audio_id),
+        build,
+        audio_cache.AUDIO_CACHE_TTL_SECONDS,
+    )
+    return cached_json_response(entry, if_none_match)
+
+
+async def get_legacy_file(db: DbSession, audio_id: UUID) -> bytes | None:
+    # Only path allowed to read the deferred blob column
+    row = (await db.execute(select(Audio.file).where(Audio.id == audio_id))).first()
+    if row is None:
+        raise AudioNotFoundError(audio_id)
+    return row.file
+
+
+def _etag(audio: Audio) -> str:
+    if audio.sha256:
+        return f'"{audio.sha256}"'
+    return f'W/"{audio.id}-{int(audio.updated_at.timestamp())}"'
+
+
+def _last_modified(audio: Audio) -> datetime:
+    # Stored timestamps are naive local time; HTTP dates have second precision
+    return audio.created_at.astimezone(UTC).replace(microsecond=0)
+
+
+def _is_not_modified(
+    etag: str,
+    last_modified: datetime,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=UTC)
+        return last_modified <= since
+    return False
+
+
+def _range_applies(if_range: str | None, etag: str, last_modified: datetime) -> bool:
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        # If-Range requires a strong match
+        return not etag.startswith("W/") and if_range == etag
+    try:
+        return parsedate_to_datetime(if_range) == last_modified
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    # Returns an inclusive (start, end) pair, or None to serve the whole file
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_str == "":
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise AudioRangeNotSatisfiableError(size)
+            return max(size - suffix, 0), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise AudioRangeNotSatisfiableError(size)
+    return start, min(end, size - 1)
+
+
+async def download(
+    db: DbSession,
+    storage: BlobStorage,
+    audio_id: UUID,
+    range_header: str | None = None,
+    if_range: str | None = None,
+    if_none_match: str | None = None,
+    if_modified_since: str | None = None,
+) -> Response:
+    audio = await _get_audio(db, audio_id)
+    etag = _etag(audio)
+    last_modified = _last_modified(audio)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": AUDIO_DOWNLOAD_CACHE_CONTROL,
+    }
+
+    if _is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    legacy_file = None
+    if audio.blob_key:
+        size = audio.size_bytes
+    else:
+        legacy_file = await get_legacy_file(db, audio_id) or b""
+        size = len(legacy_file)
+
+    byte_range = None
+    if range_header and _range_applies(if_range, etag, last_modified):
+        byte_range = _parse_range(range_header, size)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+
+    if legacy_file is not None:
+        content = iter([legacy_file[start : end + 1]])
+    else:
+        content = storage.iter_chunks(audio.blob_key, start=start, end=end)
+
+    return StreamingResponse(
+        content,
+        status_code=status_code,
+        media_type=audio.content_type or "application/octet-stream",
+        headers=headers,
+    )
+
+
+async def _load_page(
+    db: DbSession,
+    limit: int,
+    cursor: str | None,
+    status: AudioStatus | None,
+    event_id: UUID | None,
+) -> AudioPageResponse:
+    query = select(Audio).options(selectinload(Audio.track_plays))
+    if status is not None:
+        query = query.where(Audio.status == status)
+    if event_id is not None:
+        query = query.where(Audio.event_id == event_id)
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Audio.created_at, Audio.id) < tuple_(cursor_created_at, cursor_id)
         )
-        for audio in audios
-    ]
-    redis.set(
-        AUDIOS_LIST_CACHE_KEY,
-        json.dumps([r.model_dump(mode="json") for r in responses]),
-        ex=AUDIOS_LIST_CACHE_TTL_SECONDS,
+    query = query.order_by(Audio.created_at.desc(), Audio.id.desc()).limit(limit + 1)
+    audios = list((await db.execute(query)).scalars())
+
+    next_cursor = None
+    if len(audios) > limit:
+        audios = audios[:limit]
+        next_cursor = encode_cursor(audios[-1].created_at, audios[-1].id)
+    return AudioPageResponse(
+        items=[_to_response(audio) for audio in audios], next_cursor=next_cursor
+    )
+
+
+async def get_all(
+    db: DbSession,
+    redis: Redis,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    status: AudioStatus | None = None,
+    event_id: UUID | None = None,
+    if_none_match: str | None = None,
+) -> Response:
+    async def build() -> tuple[str, list[str]]:
+        page = await _load_page(db, limit, cursor, status, event_id)
+        tags = audio_cache.page_tags(
+            [item.id for item in page.items], cursor, status, event_id
+        )
+        return pack_json(page.model_dump_json()), tags
+
+    entry = await get_or_build(
+        redis,
+        audio_cache.page_key(limit, cursor, status, event_id),
+        build,
+        audio_cache.AUDIOS_PAGE_CACHE_TTL_SECONDS,
     )
-    return responses
+    return cached_json_response(entry, if_none_match)
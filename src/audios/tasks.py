@@ -1,50 +1,518 @@
 from src.core.celery import celery_app
 from src.database.database import SessionLocal
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timedelta
 from uuid import UUID
+import logging
+import os
+import threading
 import time
 
+from celery import chord
+from redis.exceptions import RedisError
+from sqlalchemy import and_, case, delete, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
 from src.audios.models import Audio, AudioStatus, TrackPlay
-from src.core.redis import get_redis
-from src.core.redis import AUDIOS_LIST_CACHE_KEY
+from src.core.cache import invalidate_tags_sync
+from src.core.kafka import AUDIOS_TOPIC
+from src.core.redis import get_sync_redis
+from src.core.storage import get_blob_storage
+from src.fingerprints.models import ReferenceTrack
+from src.outbox import service as outbox
+from src.audios import cache as audio_cache
 
+logger = logging.getLogger(__name__)
 
-@celery_app.task
-def process_audio(audio_id: str):
+# Uploads longer than this are split into segments processed in parallel
+FINGERPRINT_SEGMENT_SECONDS = float(os.getenv("FINGERPRINT_SEGMENT_SECONDS", "600"))
+PROCESSING_MAX_RETRIES = int(os.getenv("PROCESSING_MAX_RETRIES", "5"))
+# Retry delays double from this, capped and jittered
+PROCESSING_RETRY_BACKOFF_SECONDS = int(
+    os.getenv("PROCESSING_RETRY_BACKOFF_SECONDS", "5")
+)
+# A claimed audio is requeued if its lease is not renewed for this long
+PROCESSING_LEASE_SECONDS = int(os.getenv("PROCESSING_LEASE_SECONDS", "300"))
+# Claims (first run, retries, requeues) before the sweeper gives up on an audio
+PROCESSING_MAX_ATTEMPTS = int(os.getenv("PROCESSING_MAX_ATTEMPTS", "3"))
+PROCESSING_SWEEP_BATCH_SIZE = int(os.getenv("PROCESSING_SWEEP_BATCH_SIZE", "100"))
+
+# Dialects with INSERT ... ON CONFLICT, spelled the same way by both
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Connection drops, deadlocks and Redis hiccups: worth retrying. Anything else
+# (undecodable file, missing audio) fails the audio straight away.
+TRANSIENT_ERRORS = (OperationalError, RedisError)
+
+_RETRY_OPTIONS = {
+    "autoretry_for": TRANSIENT_ERRORS,
+    "max_retries": PROCESSING_MAX_RETRIES,
+    "retry_backoff": PROCESSING_RETRY_BACKOFF_SECONDS,
+    "retry_backoff_max": 600,
+    "retry_jitter": True,
+}
+
+
+def _claim_audio(audio_uuid: UUID, lease_owner: str) -> bool:
+    # PENDING -> PROCESSING under a lease. Retries and redeliveries keep their
+    # task id and take their own lease back; a duplicate process_audio for the
+    # same audio does not get it until the lease lapses.
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        previous_status = db.execute(
+            select(Audio.status).where(Audio.id == audio_uuid)
+        ).scalar_one_or_none()
+        claimed = db.execute(
+            update(Audio)
+            .where(
+                Audio.id == audio_uuid,
+                or_(
+                    Audio.status == AudioStatus.PENDING,
+                    and_(
+                        Audio.status == AudioStatus.PROCESSING,
+                        or_(
+                            Audio.lease_owner == lease_owner,
+                            Audio.lease_expires_at < now,
+                        ),
+                    ),
+                ),
+            )
+            .values(
+                status=AudioStatus.PROCESSING,
+                lease_owner=lease_owner,
+                lease_expires_at=now + timedelta(seconds=PROCESSING_LEASE_SECONDS),
+                processing_attempts=Audio.processing_attempts + 1,
+            )
+            .returning(Audio.id)
+        ).scalar_one_or_none()
+        db.commit()
+    finally:
+        db.close()
+    if claimed is not None:
+        _invalidate_status(audio_uuid, previous_status, AudioStatus.PROCESSING)
+    return claimed is not None
+
+
+def _renew_lease(audio_uuid: UUID, lease_owner: str) -> None:
+    expires_at = datetime.now() + timedelta(seconds=PROCESSING_LEASE_SECONDS)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Audio)
+            .where(
+                Audio.id == audio_uuid,
+                Audio.status == AudioStatus.PROCESSING,
+                Audio.lease_owner == lease_owner,
+                # Never shortens the longer lease given to queued segments
+                Audio.lease_expires_at < expires_at,
+            )
+            .values(lease_expires_at=expires_at)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+@contextmanager
+def _lease_heartbeat(audio_uuid: UUID, lease_owner: str):
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(PROCESSING_LEASE_SECONDS / 3):
+            try:
+                _renew_lease(audio_uuid, lease_owner)
+            except Exception:
+                logger.warning(
+                    "Could not renew the lease of audio %s", audio_uuid, exc_info=True
+                )
+
+    heartbeat = threading.Thread(target=renew, daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def _audio_source(db, audio: Audio):
+    # A seekable path when the storage backend has one, otherwise a stream
+    if audio.blob_key:
+        storage = get_blob_storage()
+        return storage.local_path(audio.blob_key) or storage.iter_chunks(audio.blob_key)
+    legacy_file = db.execute(select(Audio.file).where(Audio.id == audio.id)).scalar()
+    return iter([legacy_file or b""])
+
+
+def _plan_segments(duration: float | None) -> list[tuple[float, float | None]]:
+    from src.fingerprints.pipeline import FINGERPRINT_WINDOW_SECONDS
+
+    # Segments overlap by one window so no window straddling a boundary is lost
+    overlap = FINGERPRINT_WINDOW_SECONDS
+    if duration is None or duration <= FINGERPRINT_SEGMENT_SECONDS + overlap:
+        return [(0.0, None)]
+    segments = []
+    start = 0.0
+    while start < duration:
+        segments.append((start, FINGERPRINT_SEGMENT_SECONDS + overlap))
+        start += FINGERPRINT_SEGMENT_SECONDS
+    return segments
+
+
+def _update_status(
+    db, audio_uuid: UUID, status: AudioStatus, lease_owner: str | None = None, **values
+) -> AudioStatus | None:
+    # Ends processing and releases the lease. Returns the previous status, or
+    # None when the audio is gone or another run took its lease over. The
+    # caller commits and then invalidates.
+    current = db.execute(
+        select(Audio.status, Audio.lease_owner)
+        .where(Audio.id == audio_uuid)
+        .with_for_update()
+    ).first()
+    if current is None or (
+        lease_owner is not None and current.lease_owner != lease_owner
+    ):
+        return None
+    db.execute(
+        update(Audio)
+        .where(Audio.id == audio_uuid)
+        .values(status=status, lease_owner=None, lease_expires_at=None, **values)
+    )
+    return current.status
+
+
+def _record_failed(db, audio_uuid: UUID, reason: str) -> None:
+    outbox.record_event(
+        db,
+        AUDIOS_TOPIC,
+        "audio.failed",
+        audio_uuid,
+        {"audio_id": audio_uuid, "reason": reason},
+    )
+
+
+def _invalidate_status(
+    audio_uuid: UUID, previous_status: AudioStatus | None, status: AudioStatus
+) -> None:
+    if previous_status is not None:
+        invalidate_tags_sync(
+            get_sync_redis(),
+            audio_cache.status_changed_tags(audio_uuid, previous_status, status),
+        )
+
+
+@celery_app.task(bind=True, **_RETRY_OPTIONS)
+def process_audio(self, audio_id: str):
+    # numpy and the fingerprint index are only needed in workers; the API
+    # imports this module to enqueue tasks
+    from src.fingerprints.decoder import probe_duration
+
+    audio_uuid = UUID(audio_id)
+    lease_owner = str(self.request.id)
+    if not _claim_audio(audio_uuid, lease_owner):
+        logger.info("Audio %s is processed or being processed, skipping", audio_id)
+        return {"audio_id": audio_id, "skipped": True}
+    try:
+        with _lease_heartbeat(audio_uuid, lease_owner):
+            db = SessionLocal()
+            try:
+                audio = db.query(Audio).filter(Audio.id == audio_uuid).first()
+                if not audio:
+                    raise ValueError(f"Audio not found: {audio_id}")
+                source = _audio_source(db, audio)
+
+                duration = probe_duration(source) if isinstance(source, str) else None
+                segments = _plan_segments(duration)
+                db.execute(
+                    update(Audio)
+                    .where(Audio.id == audio_uuid)
+                    .values(
+                        segments_total=len(segments),
+                        segments_done=0,
+                        # Segments may wait in the queue before they start
+                        # renewing the lease themselves
+                        lease_expires_at=datetime.now()
+                        + timedelta(seconds=PROCESSING_LEASE_SECONDS * len(segments)),
+                    )
+                )
+                db.commit()
+            finally:
+                db.close()
+
+            if len(segments) == 1:
+                return finalize_audio(
+                    [process_audio_segment(audio_id, 0.0, None, lease_owner)],
+                    audio_id,
+                    lease_owner,
+                )
+
+        logger.info("Processing audio %s in %d segments", audio_id, len(segments))
+        chord(
+            process_audio_segment.s(audio_id, start, length, lease_owner)
+            for start, length in segments
+        )(
+            finalize_audio.s(audio_id, lease_owner).on_error(
+                mark_audio_failed.si(audio_id, lease_owner)
+            )
+        )
+        return {"audio_id": audio_id, "segments": len(segments)}
+    except TRANSIENT_ERRORS:
+        # Retried with backoff by autoretry_for, still holding the lease
+        if self.request.retries < self.max_retries:
+            raise
+        mark_audio_failed(audio_id, lease_owner)
+        raise
+    except Exception:
+        mark_audio_failed(audio_id, lease_owner)
+        raise
+
+
+@celery_app.task(**_RETRY_OPTIONS)
+def process_audio_segment(
+    audio_id: str,
+    start_seconds: float,
+    duration_seconds: float | None,
+    lease_owner: str | None = None,
+):
+    from src.fingerprints.index import get_fingerprint_index
+    from src.fingerprints.pipeline import identify
+
+    audio_uuid = UUID(audio_id)
+    # Closed before decoding: no connection or transaction is held for the
+    # minutes identify() can take
     db = SessionLocal()
-    redis = get_redis()
-    audio = None
     try:
-        audio_uuid = UUID(audio_id)
         audio = db.query(Audio).filter(Audio.id == audio_uuid).first()
         if not audio:
             raise ValueError(f"Audio not found: {audio_id}")
+        if lease_owner is not None and audio.lease_owner != lease_owner:
+            # Requeued after this run's lease lapsed: the new run does the work
+            return []
+        source = _audio_source(db, audio)
+    finally:
+        db.close()
 
-        time.sleep(3)  # simulate audio processing
+    cpu_start = time.process_time()
+    with _lease_heartbeat(audio_uuid, lease_owner):
+        plays, end_seconds = identify(
+            source,
+            get_fingerprint_index(),
+            start_seconds,
+            duration_seconds,
+        )
+    cpu_seconds = time.process_time() - cpu_start
+    audio_seconds = end_seconds - start_seconds
+    logger.info(
+        "Identified %d tracks in %.0fs of audio %s from %.0fs (%.0f audio s/CPU s)",
+        len(plays),
+        audio_seconds,
+        audio_id,
+        start_seconds,
+        audio_seconds / max(cpu_seconds, 1e-6),
+    )
 
-        tracks = [
-            TrackPlay(
-                audio_id=audio_uuid,
-                artist="Daft Punk",
-                title="One More Time",
-                duration=320,
-            ),
-            TrackPlay(
-                audio_id=audio_uuid,
-                artist="Justice",
-                title="D.A.N.C.E.",
-                duration=250,
+    db = SessionLocal()
+    try:
+        # Atomic increment: segments of the same audio finish concurrently.
+        # Capped, as a redelivered segment counts twice.
+        db.execute(
+            update(Audio)
+            .where(Audio.id == audio_uuid)
+            .values(
+                segments_done=case(
+                    (
+                        Audio.segments_done < Audio.segments_total,
+                        Audio.segments_done + 1,
+                    ),
+                    else_=Audio.segments_done,
+                )
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+    invalidate_tags_sync(get_sync_redis(), [audio_cache.audio_tag(audio_uuid)])
+    return [asdict(play) for play in plays]
+
+
+def _upsert_track_plays(db, audio_uuid: UUID, rows: list[dict]) -> None:
+    # Drops rows of an earlier, different result, then upserts on the natural
+    # key. executemany: batched into multi-row INSERTs by the driver.
+    db.execute(
+        delete(TrackPlay).where(
+            TrackPlay.audio_id == audio_uuid,
+            tuple_(TrackPlay.start_offset, TrackPlay.title).not_in(
+                [(row["start_offset"], row["title"]) for row in rows]
             ),
+        )
+    )
+    if not rows:
+        return
+    statement = _UPSERT_INSERTS[db.get_bind().dialect.name](TrackPlay)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                TrackPlay.audio_id,
+                TrackPlay.start_offset,
+                TrackPlay.title,
+            ],
+            set_={
+                "artist": statement.excluded.artist,
+                "duration": statement.excluded.duration,
+                "confidence": statement.excluded.confidence,
+            },
+        ),
+        rows,
+    )
+
+
+@celery_app.task(**_RETRY_OPTIONS)
+def finalize_audio(
+    segment_plays: list[list[dict]], audio_id: str, lease_owner: str | None = None
+):
+    from src.fingerprints.pipeline import IdentifiedPlay, merge_plays
+
+    audio_uuid = UUID(audio_id)
+    plays = merge_plays(
+        [IdentifiedPlay(**play) for plays in segment_plays for play in plays]
+    )
+    db = SessionLocal()
+    try:
+        # Locks the audio row first: a superseded run must not write results
+        previous_status = _update_status(
+            db,
+            audio_uuid,
+            AudioStatus.PROCESSED,
+            lease_owner,
+            segments_done=Audio.segments_total,
+        )
+        if previous_status is None:
+            db.rollback()
+            logger.info("Audio %s was requeued, dropping stale results", audio_id)
+            return {"audio_id": audio_id, "skipped": True}
+
+        reference_tracks = {
+            track.id: track
+            for track in db.execute(
+                select(ReferenceTrack).where(
+                    ReferenceTrack.id.in_({play.track_id for play in plays})
+                )
+            ).scalars()
+        }
+        tracks = [
+            {
+                "audio_id": audio_uuid,
+                "artist": reference_tracks[play.track_id].artist,
+                "title": reference_tracks[play.track_id].title,
+                "duration": round(play.duration),
+                # Rounded so a rerun produces the exact same key
+                "start_offset": round(play.start_offset, 3),
+                "confidence": play.confidence,
+            }
+            for play in plays
+            # Index versions can briefly reference rows not committed yet
+            if play.track_id in reference_tracks
         ]
-        db.add_all(tracks)
-        audio.status = AudioStatus.PROCESSED
+        _upsert_track_plays(db, audio_uuid, tracks)
+        outbox.record_event(
+            db,
+            AUDIOS_TOPIC,
+            "audio.processed",
+            audio_uuid,
+            {
+                "audio_id": audio_uuid,
+                "track_plays": [
+                    {key: value for key, value in track.items() if key != "audio_id"}
+                    for track in tracks
+                ],
+            },
+        )
         db.commit()
-        return {"audio_id": audio_id, "tracks": len(tracks)}
-    except Exception as e:
-        db.rollback()
-        if audio is not None:
-            audio.status = AudioStatus.FAILED
-            db.commit()
-        raise e
     finally:
         db.close()
-        redis.delete(AUDIOS_LIST_CACHE_KEY)
+
+    _invalidate_status(audio_uuid, previous_status, AudioStatus.PROCESSED)
+    return {"audio_id": audio_id, "tracks": len(tracks)}
+
+
+@celery_app.task
+def mark_audio_failed(audio_id: str, lease_owner: str | None = None):
+    audio_uuid = UUID(audio_id)
+    db = SessionLocal()
+    try:
+        previous_status = _update_status(
+            db, audio_uuid, AudioStatus.FAILED, lease_owner
+        )
+        if previous_status not in (None, AudioStatus.FAILED):
+            _record_failed(db, audio_uuid, "processing_error")
+        db.commit()
+    finally:
+        db.close()
+    _invalidate_status(audio_uuid, previous_status, AudioStatus.FAILED)
+
+
+@celery_app.task
+def requeue_expired_leases():
+    # Recovers audios whose worker died mid-processing: back to PENDING with a
+    # new outbox message, or FAILED once out of attempts
+    from src.outbox.tasks import kick_dispatcher
+
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        expired = db.execute(
+            select(Audio.id, Audio.processing_attempts)
+            .where(
+                Audio.status == AudioStatus.PROCESSING,
+                # No lease at all: stuck before leases existed
+                or_(Audio.lease_expires_at < now, Audio.lease_expires_at.is_(None)),
+            )
+            .limit(PROCESSING_SWEEP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        ).all()
+        requeued = [
+            audio_uuid
+            for audio_uuid, attempts in expired
+            if attempts < PROCESSING_MAX_ATTEMPTS
+        ]
+        failed = [
+            audio_uuid
+            for audio_uuid, attempts in expired
+            if attempts >= PROCESSING_MAX_ATTEMPTS
+        ]
+        for status, audio_uuids in (
+            (AudioStatus.PENDING, requeued),
+            (AudioStatus.FAILED, failed),
+        ):
+            if audio_uuids:
+                db.execute(
+                    update(Audio)
+                    .where(Audio.id.in_(audio_uuids))
+                    .values(status=status, lease_owner=None, lease_expires_at=None)
+                )
+        for audio_uuid in requeued:
+            outbox.enqueue(db, process_audio.name, str(audio_uuid))
+        for audio_uuid in failed:
+            _record_failed(db, audio_uuid, "lease_expired")
+        db.commit()
+    finally:
+        db.close()
+
+    for audio_uuid in requeued:
+        _invalidate_status(audio_uuid, AudioStatus.PROCESSING, AudioStatus.PENDING)
+    for audio_uuid in failed:
+        _invalidate_status(audio_uuid, AudioStatus.PROCESSING, AudioStatus.FAILED)
+    if requeued:
+        kick_dispatcher()
+    if expired:
+        logger.warning(
+            "Processing leases expired: %d audios requeued, %d failed after %d attempts",
+            len(requeued),
+            len(failed),
+            PROCESSING_MAX_ATTEMPTS,
+        )
+    return {"requeued": len(requeued), "failed": len(failed)}
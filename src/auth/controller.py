@@ -1,7 +1,7 @@
-from fastapi import APIRouter, status, Body, Request, Response, Cookie
+from fastapi import APIRouter, status, Body, Response, Cookie
 from . import service
 from ..database.database import DbSession
-from ..rate_limiting import limiter
+from .token_store import RefreshTokens
 from .schemas import (
     RegisterUserRequest,
     LoginRequest,
@@ -11,37 +11,48 @@ from .schemas import (
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
-@limiter.limit("5/hour")
+@router.post(
+    "/register",
+    status_code=status.HTTP_201_CREATED,
+    response_model=UserResponse,
+)
 async def register_user(
-    request: Request,
     db: DbSession,
+    tokens: RefreshTokens,
     response: Response,
     register_user_request: RegisterUserRequest = Body(...),
 ):
-    return service.register_user(db, response, register_user_request)
+    return await service.register_user(db, tokens, response, register_user_request)
 
 
 @router.post("/login", response_model=UserResponse)
-async def login(login_request: LoginRequest, db: DbSession, response: Response):
-    return service.login(login_request, db, response)
+async def login(
+    login_request: LoginRequest,
+    db: DbSession,
+    tokens: RefreshTokens,
+    response: Response,
+):
+    return await service.login(login_request, db, tokens, response)
 
 
 @router.post("/refresh")
 async def refresh_access_token(
     db: DbSession,
+    tokens: RefreshTokens,
     response: Response,
     refresh_token: str | None = Cookie(None),
 ):
-    return service.refresh_access_token(db, refresh_token, response)
+    return await service.refresh_access_token(db, tokens, refresh_token, response)
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout(current_user: service.CurrentUser, db: DbSession, response: Response):
+async def logout(
+    current_user: service.CurrentUser, tokens: RefreshTokens, response: Response
+):
     user_id = current_user.get_uuid()
     if user_id is None:
         raise service.AuthenticationError("Invalid user id in token")
-    service.revoke_refresh_tokens_for_user(db, user_id)
+    await tokens.revoke_user(user_id)
 
     # Clear cookies
     response.delete_cookie(
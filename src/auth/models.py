@@ -20,7 +20,7 @@ class RefreshToken(Base):
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
 
-    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), index=True, nullable=True)
     replaced_by_token_id = Column(UUID, nullable=True)
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime, timezone
-import hashlib
-import secrets
+import time
 from typing import Annotated
 from fastapi import Depends, Cookie, Response
 from uuid import UUID, uuid4
 from passlib.context import CryptContext
-import jwt
 from jwt import PyJWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.users.models import User
-from .models import RefreshToken
+from .token_store import REFRESH_TOKEN_EXPIRE_DAYS, RefreshTokenStore
+from .tokens import get_token_verifier
+from ..logging import bind_user_id
 from .schemas import (
     RegisterUserRequest,
     LoginRequest,
@@ -23,29 +26,73 @@ from fastapi.security import (
     HTTPBearer,
     HTTPAuthorizationCredentials,
 )
-from ..exceptions import AuthenticationError, UserAlreadyExistsError
+from ..core.metrics import (
+    PASSWORD_HASH_PENDING,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_SECONDS,
+)
+from ..exceptions import (
+    AuthenticationError,
+    PasswordHashingBusyError,
+    UserAlreadyExistsError,
+)
 import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
-REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small dedicated thread pool keeps hashing off
+# the event loop; beyond PASSWORD_HASH_MAX_PENDING jobs, auth requests get 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_jobs_pending = 0
+
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt_context.verify(plain_password, hashed_password)
+async def _run_password_job(operation: str, func, *args):
+    global _password_jobs_pending
+    if _password_jobs_pending >= PASSWORD_HASH_MAX_PENDING:
+        PASSWORD_HASH_REJECTED.inc()
+        logger.warning("Password hashing queue full (%d)", _password_jobs_pending)
+        raise PasswordHashingBusyError(PASSWORD_HASH_RETRY_AFTER_SECONDS)
 
+    _password_jobs_pending += 1
+    PASSWORD_HASH_PENDING.set(_password_jobs_pending)
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_jobs_pending -= 1
+        PASSWORD_HASH_PENDING.set(_password_jobs_pending)
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - start)
 
-def get_password_hash(password: str) -> str:
-    return bcrypt_context.hash(password)
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(
+        "verify", bcrypt_context.verify, plain_password, hashed_password
+    )
 
-def authenticate_user(email: str, password: str, db: Session) -> User | bool:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password):
-        logging.warning(f"Invalid email or password for user {email}")
+
+async def get_password_hash(password: str) -> str:
+    return await _run_password_job("hash", bcrypt_context.hash, password)
+
+
+async def authenticate_user(email: str, password: str, db: AsyncSession) -> User | bool:
+    user = (
+        await db.execute(select(User).where(User.email == email))
+    ).scalar_one_or_none()
+    if not user or not await verify_password(password, user.password):
+        logger.warning("Invalid email or password for user %s", email)
         return False
     return user
 
@@ -57,70 +104,25 @@ def create_access_token(email: str, user_id: UUID, expires_delta: timedelta) ->
         "id": str(user_id),
         "exp": datetime.now(timezone.utc) + expires_delta,
     }
-    return jwt.encode(encode, os.getenv("SECRET_KEY"), algorithm=os.getenv("ALGORITHM"))
-
+    return get_token_verifier().encode(encode)
 
-def _hash_refresh_token(refresh_token: str) -> str:
-    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
-
-
-def _build_refresh_token(user_id: UUID, now: datetime) -> tuple[str, RefreshToken]:
-    raw_refresh_token = secrets.token_urlsafe(48)
-    refresh_token = RefreshToken(
-        id=uuid4(),
-        user_id=user_id,
-        token_hash=_hash_refresh_token(raw_refresh_token),
-        created_at=now,
-        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
-        revoked_at=None,
-        replaced_by_token_id=None,
-    )
-    return raw_refresh_token, refresh_token
 
-
-def revoke_refresh_tokens_for_user(db: Session, user_id: UUID) -> None:
-    now = datetime.now(timezone.utc)
-    (
-        db.query(RefreshToken)
-        .filter(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
-        .update({"revoked_at": now}, synchronize_session=False)
-    )
-    db.commit()
-
-
-def refresh_access_token(
-    db: Session, refresh_token: str | None, response: Response
+async def refresh_access_token(
+    db: AsyncSession,
+    tokens: RefreshTokenStore,
+    refresh_token: str | None,
+    response: Response,
 ) -> dict[str, str]:
     if not refresh_token:
         raise AuthenticationError("Refresh token not found in cookies")
-    now = datetime.now(timezone.utc)
-    refresh_token_hash = _hash_refresh_token(refresh_token)
-
-    stored_refresh_token = (
-        db.query(RefreshToken)
-        .filter(RefreshToken.token_hash == refresh_token_hash)
-        .first()
-    )
-
-    if (
-        stored_refresh_token is None
-        or stored_refresh_token.revoked_at is not None
-        or stored_refresh_token.expires_at <= now
-    ):
-        raise AuthenticationError("Refresh token is invalid or expired")
+    user_id, new_raw_refresh_token = await tokens.rotate(refresh_token)
 
-    user = db.query(User).filter(User.id == stored_refresh_token.user_id).first()
+    user = (
+        await db.execute(select(User).where(User.id == user_id))
+    ).scalar_one_or_none()
     if not user:
         raise AuthenticationError("User not found for refresh token")
 
-    stored_refresh_token.revoked_at = now
-
-    new_raw_refresh_token, new_refresh_token = _build_refresh_token(user.id, now)
-    stored_refresh_token.replaced_by_token_id = new_refresh_token.id
-
-    db.add(new_refresh_token)
-    db.commit()
-
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(user.email, user.id, access_token_expires)
 
@@ -147,13 +149,10 @@ def refresh_access_token(
 
 def verify_token(token: str) -> TokenData:
     try:
-        payload = jwt.decode(
-            token, os.getenv("SECRET_KEY"), algorithms=[os.getenv("ALGORITHM")]
-        )
-        user_id: str = payload.get("id")
-        return TokenData(user_id=user_id)
-    except PyJWTError:
-        logging.warning(f"Could not validate credentials for token {token}")
+        return get_token_verifier().verify(token)
+    except PyJWTError as e:
+        # Never the token itself: it is a credential, and attacker-sized
+        logger.warning("Could not validate credentials: %s", type(e).__name__)
         raise AuthenticationError(
             "Could not validate credentials, the token is invalid or expired"
         )
@@ -173,13 +172,21 @@ def get_access_token(
     return None
 
 
-def register_user(
-    db: Session, response: Response, register_user_request: RegisterUserRequest
+async def register_user(
+    db: AsyncSession,
+    tokens: RefreshTokenStore,
+    response: Response,
+    register_user_request: RegisterUserRequest,
 ) -> UserResponse:
     try:
-        if db.query(User).filter(User.email == register_user_request.email).first():
-            logging.warning(
-                f"User with email {register_user_request.email} already exists"
+        existing_user = (
+            await db.execute(
+                select(User).where(User.email == register_user_request.email)
+            )
+        ).scalar_one_or_none()
+        if existing_user:
+            logger.warning(
+                "User with email %s already exists", register_user_request.email
             )
             raise UserAlreadyExistsError(f"{register_user_request.email}")
         user = User(
@@ -187,18 +194,13 @@ def register_user(
             email=register_user_request.email,
             first_name=register_user_request.first_name,
             last_name=register_user_request.last_name,
-            password=get_password_hash(register_user_request.password),
+            password=await get_password_hash(register_user_request.password),
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(user.email, user.id, access_token_expires)
-
-        now = datetime.now(timezone.utc)
-        raw_refresh_token, refresh_token = _build_refresh_token(user.id, now)
-        db.add(refresh_token)
-        db.commit()
+        raw_refresh_token = await tokens.issue(user.id)
 
         response.set_cookie(
             key="access_token",
@@ -225,7 +227,7 @@ def register_user(
             created_at=user.created_at,
         )
     except Exception as e:
-        logging.error(f"Error registering user: {e}")
+        logger.error("Error registering user: %s", e)
         raise e
 
 
@@ -234,26 +236,27 @@ def get_current_user(
 ) -> TokenData:
     if not access_token:
         raise AuthenticationError("Access token not found")
-    return verify_token(access_token)
+    token_data = verify_token(access_token)
+    bind_user_id(token_data.user_id)
+    return token_data
 
 
 # type alias, when this is used in an endpoint, it will automatically call verify token
 CurrentUser = Annotated[TokenData, Depends(get_current_user)]
 
 
-def login(
-    login_request: LoginRequest, db: Session, response: Response
+async def login(
+    login_request: LoginRequest,
+    db: AsyncSession,
+    tokens: RefreshTokenStore,
+    response: Response,
 ) -> UserResponse:
-    user = authenticate_user(login_request.email, login_request.password, db)
+    user = await authenticate_user(login_request.email, login_request.password, db)
     if not user:
         raise AuthenticationError("Invalid email or password")
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(user.email, user.id, access_token_expires)
-
-    now = datetime.now(timezone.utc)
-    raw_refresh_token, refresh_token = _build_refresh_token(user.id, now)
-    db.add(refresh_token)
-    db.commit()
+    raw_refresh_token = await tokens.issue(user.id)
 
     response.set_cookie(
         key="access_token",
@@ -0,0 +1,60 @@
+import logging
+import os
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from src.auth.models import RefreshToken
+from src.core.celery import celery_app
+from src.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_PRUNE_BATCH_SIZE = int(
+    os.getenv("REFRESH_TOKEN_PRUNE_BATCH_SIZE", "1000")
+)
+REFRESH_TOKEN_PRUNE_MAX_BATCHES = int(
+    os.getenv("REFRESH_TOKEN_PRUNE_MAX_BATCHES", "50")
+)
+# Rotated tokens are kept for a while so reuse can still be detected
+REFRESH_TOKEN_REVOKED_RETENTION_HOURS = int(
+    os.getenv("REFRESH_TOKEN_REVOKED_RETENTION_HOURS", "24")
+)
+
+
+@celery_app.task
+def prune_refresh_tokens():
+    now = datetime.now(UTC)
+    revoked_before = now - timedelta(hours=REFRESH_TOKEN_REVOKED_RETENTION_HOURS)
+    conditions = (
+        RefreshToken.expires_at <= now,
+        RefreshToken.revoked_at <= revoked_before,
+    )
+
+    deleted = 0
+    db = SessionLocal()
+    try:
+        for condition in conditions:
+            # Short transactions: one bounded batch each, so pruning never
+            # holds long locks on the table
+            for _ in range(REFRESH_TOKEN_PRUNE_MAX_BATCHES):
+                batch = (
+                    select(RefreshToken.id)
+                    .where(condition)
+                    .limit(REFRESH_TOKEN_PRUNE_BATCH_SIZE)
+                    .scalar_subquery()
+                )
+                result = db.execute(
+                    delete(RefreshToken)
+                    .where(RefreshToken.id.in_(batch))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+                deleted += result.rowcount
+                if result.rowcount < REFRESH_TOKEN_PRUNE_BATCH_SIZE:
+                    break
+    finally:
+        db.close()
+
+    logger.info("Pruned %d refresh tokens", deleted)
+    return {"deleted": deleted}
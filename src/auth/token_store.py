@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import secrets
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime, timedelta
+from typing import Annotated
+from uuid import UUID, uuid4
+
+from fastapi import Depends
+from redis.asyncio import Redis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.redis import RedisClient
+from ..database.database import DbSession
+from ..exceptions import AuthenticationError
+from .models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_EXPIRE_DAYS = 7
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "sql")
+
+# Keys of one user share the {user_id} hash tag: each Redis script only
+# touches keys of one Cluster slot, all of them passed through KEYS
+REFRESH_TOKEN_KEY_PREFIX = "refresh:"
+
+
+def _hash_refresh_token(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+
+def _new_refresh_token() -> str:
+    return secrets.token_urlsafe(48)
+
+
+class RefreshTokenStore(ABC):
+    @abstractmethod
+    async def issue(self, user_id: UUID) -> str: ...
+
+    # Returns the user id and a replacement token. Presenting a token that was
+    # already rotated revokes all of the user's tokens: one copy has leaked
+    @abstractmethod
+    async def rotate(self, refresh_token: str) -> tuple[UUID, str]: ...
+
+    @abstractmethod
+    async def revoke_user(self, user_id: UUID) -> None: ...
+
+
+class SqlRefreshTokenStore(RefreshTokenStore):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _build(self, user_id: UUID, now: datetime) -> tuple[str, RefreshToken]:
+        raw_refresh_token = _new_refresh_token()
+        refresh_token = RefreshToken(
+            id=uuid4(),
+            user_id=user_id,
+            token_hash=_hash_refresh_token(raw_refresh_token),
+            created_at=now,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            revoked_at=None,
+            replaced_by_token_id=None,
+        )
+        return raw_refresh_token, refresh_token
+
+    async def issue(self, user_id: UUID) -> str:
+        raw_refresh_token, refresh_token = self._build(user_id, datetime.now(UTC))
+        self.db.add(refresh_token)
+        await self.db.commit()
+        return raw_refresh_token
+
+    async def rotate(self, refresh_token: str) -> tuple[UUID, str]:
+        now = datetime.now(UTC)
+        token_hash = _hash_refresh_token(refresh_token)
+
+        # Conditional update: of two concurrent refreshes only one wins
+        user_id = (
+            await self.db.execute(
+                update(RefreshToken)
+                .where(
+                    RefreshToken.token_hash == token_hash,
+                    RefreshToken.revoked_at.is_(None),
+                    RefreshToken.expires_at > now,
+                )
+                .values(revoked_at=now)
+                .returning(RefreshToken.user_id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalar_one_or_none()
+
+        if user_id is None:
+            stored = (
+                await self.db.execute(
+                    select(
+                        RefreshToken.user_id, RefreshToken.replaced_by_token_id
+                    ).where(RefreshToken.token_hash == token_hash)
+                )
+            ).first()
+            if stored is not None and stored.replaced_by_token_id is not None:
+                logger.warning(
+                    "Refresh token reuse detected for user %s", stored.user_id
+                )
+                await self.revoke_user(stored.user_id)
+            else:
+                await self.db.rollback()
+            raise AuthenticationError("Refresh token is invalid or expired")
+
+        raw_refresh_token, new_refresh_token = self._build(user_id, now)
+        self.db.add(new_refresh_token)
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash)
+            .values(replaced_by_token_id=new_refresh_token.id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return user_id, raw_refresh_token
+
+    async def revoke_user(self, user_id: UUID) -> None:
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(UTC))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+
+def _token_key(user_id: UUID, token_hash: str) -> str:
+    return f"{REFRESH_TOKEN_KEY_PREFIX}{{{user_id}}}:token:{token_hash}"
+
+
+def _user_key(user_id: UUID) -> str:
+    return f"{REFRESH_TOKEN_KEY_PREFIX}{{{user_id}}}:tokens"
+
+
+# Token keys hold "active" or, once rotated, "rotated" until the original
+# expiry so that reuse can still be detected. A token is only valid while it is
+# in its user's set: revoking them all is a single DEL of the set.
+# KEYS: token, user set; ARGV: ttl, token hash
+_ISSUE = """
+redis.call('SET', KEYS[1], 'active', 'EX', ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS: token, new token, user set; ARGV: ttl, token hash, new token hash
+_ROTATE = """
+local state = redis.call('GET', KEYS[1])
+if state == 'rotated' then
+    redis.call('DEL', KEYS[3])
+    return 'reused'
+end
+if state ~= 'active' or redis.call('SREM', KEYS[3], ARGV[2]) == 0 then
+    return 'invalid'
+end
+redis.call('SET', KEYS[1], 'rotated', 'KEEPTTL')
+redis.call('SET', KEYS[2], 'active', 'EX', ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[1])
+return 'rotated'
+"""
+
+
+class RedisRefreshTokenStore(RefreshTokenStore):
+    # Native TTLs replace expiry cleanup; the user set only tracks active tokens
+    ttl_seconds = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def issue(self, user_id: UUID) -> str:
+        # Prefixed with the user id, which names the keys to look up
+        raw_refresh_token = f"{user_id}.{_new_refresh_token()}"
+        token_hash = _hash_refresh_token(raw_refresh_token)
+        await self.redis.eval(
+            _ISSUE,
+            2,
+            _token_key(user_id, token_hash),
+            _user_key(user_id),
+            self.ttl_seconds,
+            token_hash,
+        )
+        return raw_refresh_token
+
+    async def rotate(self, refresh_token: str) -> tuple[UUID, str]:
+        try:
+            user_id = UUID(refresh_token.partition(".")[0])
+        except ValueError:
+            raise AuthenticationError("Refresh token is invalid or expired") from None
+        token_hash = _hash_refresh_token(refresh_token)
+        raw_refresh_token = f"{user_id}.{_new_refresh_token()}"
+        new_token_hash = _hash_refresh_token(raw_refresh_token)
+        result = await self.redis.eval(
+            _ROTATE,
+            3,
+            _token_key(user_id, token_hash),
+            _token_key(user_id, new_token_hash),
+            _user_key(user_id),
+            self.ttl_seconds,
+            token_hash,
+            new_token_hash,
+        )
+        if result == "reused":
+            logger.warning("Refresh token reuse detected for user %s", user_id)
+        if result != "rotated":
+            raise AuthenticationError("Refresh token is invalid or expired")
+        return user_id, raw_refresh_token
+
+    async def revoke_user(self, user_id: UUID) -> None:
+        await self.redis.delete(_user_key(user_id))
+
+
+def get_refresh_token_store(db: DbSession, redis: RedisClient) -> RefreshTokenStore:
+    if REFRESH_TOKEN_STORE == "redis":
+        return RedisRefreshTokenStore(redis)
+    return SqlRefreshTokenStore(db)
+
+
+RefreshTokens = Annotated[RefreshTokenStore, Depends(get_refresh_token_store)]
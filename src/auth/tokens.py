@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+
+import jwt
+from jwt import InvalidTokenError
+
+from .schemas import TokenData
+
+JWT_VERIFY_CACHE_SIZE = int(os.getenv("JWT_VERIFY_CACHE_SIZE", "10000"))
+# Tokens issued before key ids were introduced carry no "kid" header
+LEGACY_KID = "default"
+
+
+def _parse_keys(raw: str) -> dict[str, str]:
+    # JWT_KEYS="kid1:secret1,kid2:secret2"
+    keys = {}
+    for item in raw.split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("JWT_KEYS entries must look like <kid>:<secret>")
+        keys[kid] = secret
+    return keys
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        keys: dict[str, str],
+        active_kid: str,
+        algorithm: str,
+        cache_size: int = JWT_VERIFY_CACHE_SIZE,
+    ):
+        if active_kid not in keys:
+            raise ValueError(f"Active JWT key {active_kid} is not configured")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.algorithm = algorithm
+        self.cache_size = cache_size
+        # token -> (verified data, exp timestamp)
+        self._verified: OrderedDict[str, tuple[TokenData, float]] = OrderedDict()
+        # Sync dependencies run in the threadpool, so verify() runs concurrently
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TokenVerifier":
+        algorithm = os.getenv("ALGORITHM")
+        raw_keys = os.getenv("JWT_KEYS")
+        if raw_keys:
+            keys = _parse_keys(raw_keys)
+            active_kid = os.getenv("JWT_ACTIVE_KID", next(iter(keys)))
+        else:
+            keys = {LEGACY_KID: os.getenv("SECRET_KEY")}
+            active_kid = LEGACY_KID
+        return cls(keys, active_kid, algorithm)
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(
+            payload,
+            self.keys[self.active_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.active_kid},
+        )
+
+    def verify(self, token: str) -> TokenData:
+        with self._lock:
+            cached = self._verified.get(token)
+            if cached is not None:
+                data, expires_at = cached
+                if expires_at > time.time():
+                    self._verified.move_to_end(token)
+                    return data
+                self._verified.pop(token, None)
+
+        # Decoded outside the lock: the signature check is the expensive part
+        kid = jwt.get_unverified_header(token).get("kid") or LEGACY_KID
+        key = self.keys.get(kid)
+        if key is None:
+            raise InvalidTokenError(f"Unknown signing key {kid}")
+        payload = jwt.decode(
+            token, key, algorithms=[self.algorithm], options={"require": ["exp"]}
+        )
+        data = TokenData(user_id=payload.get("id"))
+
+        with self._lock:
+            self._verified[token] = (data, float(payload["exp"]))
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return data
+
+
+_token_verifier: TokenVerifier | None = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    global _token_verifier
+    if _token_verifier is None:
+        _token_verifier = TokenVerifier.from_env()
+    return _token_verifier
+
+
+_BENCHMARK_SECRET = "benchmark-secret-of-at-least-32-bytes"
+
+
+def _per_call_seconds(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def benchmark(iterations: int, tokens: int) -> dict:
+    # Auth cost of one request, per verification strategy
+    verifier = TokenVerifier({LEGACY_KID: _BENCHMARK_SECRET}, LEGACY_KID, "HS256")
+    uncached = TokenVerifier(
+        verifier.keys, verifier.active_kid, verifier.algorithm, cache_size=0
+    )
+    expires_at = datetime.now(UTC) + timedelta(hours=1)
+    issued = [
+        verifier.encode(
+            {"sub": f"user{i}@example.com", "id": str(i), "exp": expires_at}
+        )
+        for i in range(tokens)
+    ]
+
+    def round_robin(verify):
+        # Cycles through the tokens like requests from different clients
+        position = iter(range(iterations))
+        return lambda: verify(issued[next(position) % tokens])
+
+    def per_request_decode(token: str) -> TokenData:
+        # What verify_token did before the verifier: read the settings and
+        # fully decode on every call
+        os.getenv("SECRET_KEY")
+        os.getenv("ALGORITHM")
+        payload = jwt.decode(token, _BENCHMARK_SECRET, algorithms=["HS256"])
+        return TokenData(user_id=payload.get("id"))
+
+    # Fills the LRU, so the cached run only measures hits
+    for token in issued:
+        verifier.verify(token)
+
+    results = {
+        "per_request_decode": _per_call_seconds(
+            round_robin(per_request_decode), iterations
+        ),
+        "verifier_uncached": _per_call_seconds(
+            round_robin(uncached.verify), iterations
+        ),
+        "verifier_cached": _per_call_seconds(round_robin(verifier.verify), iterations),
+    }
+    return {
+        "iterations": iterations,
+        "tokens": tokens,
+        **{name: round(seconds * 1e6, 2) for name, seconds in results.items()},
+        "unit": "us/request",
+    }
+
+
+if __name__ == "__main__":
+    # python -m src.auth.tokens --iterations 100000 --tokens 1000
+    # Prints one JSON line of microseconds per verified request
+    parser = argparse.ArgumentParser(description="Measure auth overhead per request")
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(json.dumps(benchmark(args.iterations, args.tokens)))
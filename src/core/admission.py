@@ -0,0 +1,68 @@
+import os
+
+from fastapi.responses import JSONResponse
+
+from ..database.database import async_engine
+from .metrics import HTTP_REQUESTS_SHED
+
+# Limits past which new requests get a 503 instead of queueing behind the
+# ones already running; 0 disables a limit. Per process.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+ADMISSION_MAX_DB_POOL_WAIT_SECONDS = float(
+    os.getenv("ADMISSION_MAX_DB_POOL_WAIT_SECONDS", "0")
+)
+# Pool waits older than this are ignored, so shedding (which stops new
+# checkouts) cannot keep itself going
+ADMISSION_DB_POOL_WAIT_WINDOW_SECONDS = float(
+    os.getenv("ADMISSION_DB_POOL_WAIT_WINDOW_SECONDS", "5")
+)
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Probes and scrapes are always served: they are how an overload is seen
+ADMISSION_EXEMPT_PATHS = frozenset({"/healthz", "/readyz", "/metrics"})
+
+
+def _db_pool_wait_seconds() -> float:
+    # NullPool (PgBouncer) has no wait to report
+    pool = async_engine.pool
+    if not hasattr(pool, "recent_wait_seconds"):
+        return 0.0
+    return pool.recent_wait_seconds(ADMISSION_DB_POOL_WAIT_WINDOW_SECONDS)
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    def _overload_reason(self) -> str | None:
+        if ADMISSION_MAX_IN_FLIGHT and self.in_flight >= ADMISSION_MAX_IN_FLIGHT:
+            return "in_flight"
+        if (
+            ADMISSION_MAX_DB_POOL_WAIT_SECONDS
+            and _db_pool_wait_seconds() > ADMISSION_MAX_DB_POOL_WAIT_SECONDS
+        ):
+            return "db_pool_wait"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._overload_reason()
+        if reason is not None:
+            HTTP_REQUESTS_SHED.labels(reason).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, please retry"},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
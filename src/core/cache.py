@@ -0,0 +1,301 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from uuid import uuid4
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from src.core.metrics import CACHE_REQUESTS, L1_CACHE_BYTES, L1_CACHE_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+CACHE_CLOCK_KEY = "cache:clock"
+CACHE_INVALIDATION_CHANNEL = "cache:invalidations"
+CACHE_TAG_PREFIX = "cache:tag:"
+CACHE_LOCK_TTL_MS = 10_000
+CACHE_LOCK_WAIT_SECONDS = 5.0
+CACHE_LOCK_POLL_SECONDS = 0.05
+# Tag invalidation markers must outlive any entry built before them
+CACHE_TAG_MARKER_TTL_SECONDS = 3600
+
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", "1024"))
+L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Safety net in case an invalidation message is missed during a reconnect
+L1_CACHE_TTL_SECONDS = float(os.getenv("L1_CACHE_TTL_SECONDS", "5"))
+
+# KEYS: value key, tag sets...; ARGV: value, ttl, clock read before building.
+# Skip the write if any tag was invalidated while the value was being built.
+_SET_TAGGED = """
+for i = 2, #KEYS do
+    local invalidated_at = redis.call('GET', KEYS[i] .. ':ts')
+    if invalidated_at and tonumber(invalidated_at) > tonumber(ARGV[3]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if redis.call('TTL', KEYS[i]) < tonumber(ARGV[2]) then
+        redis.call('EXPIRE', KEYS[i], ARGV[2])
+    end
+end
+return 1
+"""
+
+# KEYS: clock, tag sets...; ARGV: marker ttl. Returns the deleted keys.
+_INVALIDATE_TAGS = """
+local now = redis.call('INCR', KEYS[1])
+local deleted = {}
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i] .. ':ts', now, 'EX', ARGV[1])
+    local members = redis.call('SMEMBERS', KEYS[i])
+    for _, key in ipairs(members) do
+        redis.call('DEL', key)
+        table.insert(deleted, key)
+    end
+    redis.call('DEL', KEYS[i])
+end
+return deleted
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LocalCache:
+    # Process-local LRU with a TTL, bounded by entry count and value size
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        # Bumped on every invalidation so in-flight fills can detect a race
+        self.generation = 0
+        self._entries: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                self._update_gauges()
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, generation: int) -> None:
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._pop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self.size_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.size_bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+            self._update_gauges()
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._pop(key)
+            self._update_gauges()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.size_bytes = 0
+            self._update_gauges()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[2]
+
+    def _update_gauges(self) -> None:
+        L1_CACHE_BYTES.set(self.size_bytes)
+        L1_CACHE_ENTRIES.set(len(self._entries))
+
+
+local_cache = LocalCache(L1_CACHE_MAX_ENTRIES, L1_CACHE_MAX_BYTES, L1_CACHE_TTL_SECONDS)
+# L1 is only consulted once this process listens for invalidations
+_local_cache_enabled = False
+_listener = None
+
+_L1_HITS = CACHE_REQUESTS.labels("l1", "hit")
+_L1_MISSES = CACHE_REQUESTS.labels("l1", "miss")
+_L2_HITS = CACHE_REQUESTS.labels("l2", "hit")
+_L2_MISSES = CACHE_REQUESTS.labels("l2", "miss")
+
+
+def _on_invalidation(message: dict) -> None:
+    try:
+        keys = json.loads(message["data"])
+    except (TypeError, ValueError):
+        local_cache.clear()
+        return
+    local_cache.delete(keys)
+
+
+async def _listen_for_invalidations(redis: AsyncRedis) -> None:
+    while True:
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            while True:
+                # Poll with a timeout shorter than the pool's socket_timeout
+                message = await pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    _on_invalidation(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Messages may have been lost while disconnected, so drop everything
+            logger.warning("Cache invalidation listener error", exc_info=True)
+            local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def start_invalidation_listener(redis: AsyncRedis) -> None:
+    global _listener, _local_cache_enabled
+    if _listener is not None:
+        return
+    _listener = asyncio.create_task(_listen_for_invalidations(redis))
+    _local_cache_enabled = True
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener, _local_cache_enabled
+    _local_cache_enabled = False
+    if _listener is not None:
+        _listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _listener
+        _listener = None
+    local_cache.clear()
+
+
+def _tag_key(tag: str) -> str:
+    return f"{CACHE_TAG_PREFIX}{tag}"
+
+
+def _invalidation_args(tags: Iterable[str]) -> list:
+    tag_keys = [_tag_key(tag) for tag in set(tags)]
+    return [
+        _INVALIDATE_TAGS,
+        1 + len(tag_keys),
+        CACHE_CLOCK_KEY,
+        *tag_keys,
+        CACHE_TAG_MARKER_TTL_SECONDS,
+    ]
+
+
+async def invalidate_tags(redis: AsyncRedis, tags: Iterable[str]) -> None:
+    args = _invalidation_args(tags)
+    if args[1] == 1:
+        return
+    deleted = await redis.eval(*args)
+    if deleted:
+        local_cache.delete(deleted)
+        await redis.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(deleted))
+
+
+# Blocking variant for Celery tasks
+def invalidate_tags_sync(redis: Redis, tags: Iterable[str]) -> None:
+    args = _invalidation_args(tags)
+    if args[1] == 1:
+        return
+    deleted = redis.eval(*args)
+    if deleted:
+        redis.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(deleted))
+
+
+async def _set_tagged(
+    redis: AsyncRedis, key: str, value: str, ttl: int, tags: Iterable[str], clock: int
+) -> bool:
+    tag_keys = [_tag_key(tag) for tag in tags]
+    return bool(
+        await redis.eval(
+            _SET_TAGGED, 1 + len(tag_keys), key, *tag_keys, value, ttl, clock
+        )
+    )
+
+
+async def get_or_build(
+    redis: AsyncRedis,
+    key: str,
+    build: Callable[[], Awaitable[tuple[str, list[str]]]],
+    ttl: int,
+) -> str:
+    # build returns the serialized value and the tags it depends on
+    if _local_cache_enabled:
+        cached = local_cache.get(key)
+        if cached is not None:
+            _L1_HITS.inc()
+            return cached
+        _L1_MISSES.inc()
+
+    generation = local_cache.generation
+    cached = await redis.get(key)
+    if cached is not None:
+        _L2_HITS.inc()
+        if _local_cache_enabled:
+            local_cache.set(key, cached, generation)
+        return cached
+    _L2_MISSES.inc()
+
+    # Single flight: one caller rebuilds, the others wait for its result
+    lock_key = f"{key}:lock"
+    token = uuid4().hex
+    if await redis.set(lock_key, token, nx=True, px=CACHE_LOCK_TTL_MS):
+        try:
+            clock = int(await redis.get(CACHE_CLOCK_KEY) or 0)
+            value, tags = await build()
+            stored = await _set_tagged(redis, key, value, ttl, tags, clock)
+            if stored and _local_cache_enabled:
+                local_cache.set(key, value, generation)
+            return value
+        finally:
+            await redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+
+    deadline = time.monotonic() + CACHE_LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(CACHE_LOCK_POLL_SECONDS)
+        lock_held = await redis.exists(lock_key)
+        cached = await redis.get(key)
+        if cached is not None:
+            return cached
+        if not lock_held:
+            # The holder failed or its write was skipped as stale
+            break
+
+    value, _ = await build()
+    return value
@@ -1,10 +1,103 @@
+import logging
 import os
 
 from celery import Celery
+from celery.signals import (
+    setup_logging,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from prometheus_client import start_http_server
+
+from ..logging import (
+    LogLevels,
+    bind_task_context,
+    clear_task_context,
+    configure_logging,
+    start_level_watcher,
+)
+from .instrumentation import instrument_celery
+from .metrics import mark_process_dead, metrics_registry
+
+# Workers serve /metrics on this port; prefork children are only included
+# with PROMETHEUS_MULTIPROC_DIR set
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", "0"))
 
 celery_app = Celery(
     "tasks",
     broker=os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"),
     backend=os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0"),
-    include=["src.audios.tasks", "src.events.models"],
+    include=[
+        "src.audios.tasks",
+        "src.auth.tasks",
+        "src.events.models",
+        "src.outbox.tasks",
+    ],
 )
+
+# Long tasks (audio segments): a worker only reserves what it is running, so
+# idle workers pick up the remaining segments
+celery_app.conf.worker_prefetch_multiplier = 1
+
+# Acknowledge after the task ran: a crashed worker's tasks are redelivered
+# instead of lost, so tasks must be safe to run twice. The visibility timeout
+# has to outlast the longest task or Redis redelivers it while still running.
+celery_app.conf.task_acks_late = True
+celery_app.conf.task_reject_on_worker_lost = True
+celery_app.conf.broker_transport_options = {
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT_SECONDS", "3600"))
+}
+
+instrument_celery()
+
+
+@setup_logging.connect
+def _configure_logging(loglevel=None, **kwargs):
+    # Replaces Celery's own logging setup with the app's JSON pipeline
+    configure_logging(loglevel or LogLevels.info)
+
+
+@worker_process_init.connect
+def _restart_logging(**kwargs):
+    # Threads do not survive the fork: the queue listener and the level
+    # watcher are started again in each prefork child
+    configure_logging(logging.getLevelName(logging.getLogger().level))
+    start_level_watcher()
+
+
+task_prerun.connect(bind_task_context, weak=False)
+task_postrun.connect(clear_task_context, weak=False)
+
+
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    if CELERY_METRICS_PORT:
+        start_http_server(CELERY_METRICS_PORT, registry=metrics_registry())
+
+
+@worker_process_shutdown.connect
+def _drop_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
+
+
+celery_app.conf.beat_schedule = {
+    "prune-refresh-tokens": {
+        "task": "src.auth.tasks.prune_refresh_tokens",
+        "schedule": float(os.getenv("REFRESH_TOKEN_PRUNE_INTERVAL_SECONDS", "3600")),
+    },
+    "dispatch-outbox": {
+        "task": "src.outbox.tasks.dispatch_outbox",
+        "schedule": float(os.getenv("OUTBOX_DISPATCH_INTERVAL_SECONDS", "5")),
+    },
+    "publish-outbox-events": {
+        "task": "src.outbox.tasks.publish_outbox_events",
+        "schedule": float(os.getenv("OUTBOX_EVENTS_PUBLISH_INTERVAL_SECONDS", "2")),
+    },
+    "requeue-expired-leases": {
+        "task": "src.audios.tasks.requeue_expired_leases",
+        "schedule": float(os.getenv("PROCESSING_SWEEP_INTERVAL_SECONDS", "60")),
+    },
+}
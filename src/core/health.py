@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from ..database.database import async_engine
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Probes within this window share one check instead of each hitting the
+# dependencies
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "2"))
+# Below the DB pool timeout: an exhausted pool fails the check quickly
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+
+
+@dataclass
+class CheckResult:
+    ok: bool
+    latency_ms: float
+    error: str | None = None
+
+
+class _CachedCheck:
+    def __init__(self, check: Callable[[], Awaitable[None]]):
+        self.check = check
+        self._result: CheckResult | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> CheckResult | None:
+        if time.monotonic() - self._checked_at < HEALTH_CHECK_CACHE_SECONDS:
+            return self._result
+        return None
+
+    async def run(self) -> CheckResult:
+        result = self._fresh()
+        if result is not None:
+            return result
+        async with self._lock:
+            # Probes that waited on the lock get the result just computed
+            result = self._fresh()
+            if result is not None:
+                return result
+            start = time.perf_counter()
+            error = None
+            try:
+                await asyncio.wait_for(self.check(), HEALTH_CHECK_TIMEOUT_SECONDS)
+            except TimeoutError:
+                error = f"timed out after {HEALTH_CHECK_TIMEOUT_SECONDS}s"
+            except Exception as e:
+                # Any failure means not ready; the reason goes in the response
+                logger.warning("Readiness check failed", exc_info=True)
+                error = f"{type(e).__name__}: {e}"
+            result = CheckResult(
+                ok=error is None,
+                latency_ms=round((time.perf_counter() - start) * 1000, 1),
+                error=error,
+            )
+            self._result = result
+            self._checked_at = time.monotonic()
+            return result
+
+
+async def _check_database() -> None:
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _check_redis() -> None:
+    await get_redis().ping()
+
+
+def _ping_broker() -> None:
+    # Imported here: the API only loads Celery once it needs it
+    from .celery import celery_app
+
+    # Bounded on the socket itself: wait_for gives up on the thread running
+    # this, but cannot stop it, so a hung connect would pile up threads
+    with celery_app.connection_for_write(
+        connect_timeout=HEALTH_CHECK_TIMEOUT_SECONDS,
+        transport_options={
+            "max_retries": 0,
+            "socket_connect_timeout": HEALTH_CHECK_TIMEOUT_SECONDS,
+            "socket_timeout": HEALTH_CHECK_TIMEOUT_SECONDS,
+        },
+    ) as connection:
+        connection.ensure_connection(max_retries=1)
+
+
+async def _check_broker() -> None:
+    await run_in_threadpool(_ping_broker)
+
+
+_checks = {
+    "database": _CachedCheck(_check_database),
+    "redis": _CachedCheck(_check_redis),
+    "broker": _CachedCheck(_check_broker),
+}
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    # Liveness: the process serves requests. Dependencies are left to
+    # /readyz, so an outage does not get every instance restarted.
+    return {"status": "ok"}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    results = await asyncio.gather(*(check.run() for check in _checks.values()))
+    ready = all(result.ok for result in results)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ok" if ready else "unavailable",
+            "checks": {name: asdict(result) for name, result in zip(_checks, results)},
+        },
+    )
@@ -0,0 +1,177 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import (
+    CELERY_PUBLISH_SECONDS,
+    CELERY_TASK_SECONDS,
+    DB_N_PLUS_ONE,
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_SECONDS,
+    DB_SECONDS_PER_REQUEST,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_RESPONSE_BYTES,
+    PROMETHEUS_MULTIPROC_DIR,
+    refresh_collectors,
+)
+
+logger = logging.getLogger(__name__)
+
+# The same statement this many times in one request is reported as N+1
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+
+# Route label for requests that matched no route: raw paths would explode
+# the label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class _RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: dict[str, int] = field(default_factory=dict)
+    n_plus_one_reported: bool = False
+
+
+_request_stats: ContextVar[_RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class RequestMetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware: streamed downloads pass
+    # through untouched and are timed until their last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        response_bytes = 0
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_metrics(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            _request_stats.reset(token)
+
+            route = _route_label(scope)
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+            HTTP_RESPONSE_BYTES.labels(method, route).observe(response_bytes)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_SECONDS_PER_REQUEST.labels(route).observe(stats.db_seconds)
+            if stats.n_plus_one_reported:
+                DB_N_PLUS_ONE.labels(route).inc()
+            if PROMETHEUS_MULTIPROC_DIR:
+                refresh_collectors()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started_at = time.perf_counter()
+
+
+def _record_query(pool: str, statement: str, context) -> None:
+    elapsed = time.perf_counter() - context._metrics_started_at
+    DB_QUERY_SECONDS.labels(pool).observe(elapsed)
+
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    count = stats.statements.get(statement, 0) + 1
+    stats.statements[statement] = count
+    if count == DB_N_PLUS_ONE_THRESHOLD and not stats.n_plus_one_reported:
+        stats.n_plus_one_reported = True
+        logger.warning(
+            "Possible N+1: statement ran %d times in one request: %s",
+            count,
+            " ".join(statement.split())[:200],
+        )
+
+
+def instrument_engine(engine: Engine, pool: str) -> None:
+    # Async engines are instrumented through their sync_engine; the request
+    # context still reaches these hooks as SQLAlchemy runs the driver calls
+    # in a greenlet sharing the caller's contextvars
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _record_query(pool, statement, context)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+# Task id -> start time. Publishing and running happen on the same thread
+# for a given task, in the publishing and the worker process respectively.
+_publish_started_at: dict[str, float] = {}
+_task_started_at: dict[str, float] = {}
+
+
+def _before_task_publish(sender=None, headers=None, **kwargs):
+    if headers and "id" in headers:
+        _publish_started_at[headers["id"]] = time.perf_counter()
+
+
+def _after_task_publish(sender=None, headers=None, **kwargs):
+    started_at = _publish_started_at.pop((headers or {}).get("id"), None)
+    if started_at is not None:
+        CELERY_PUBLISH_SECONDS.labels(sender).observe(time.perf_counter() - started_at)
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        CELERY_TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started_at
+        )
+
+
+def instrument_celery() -> None:
+    # Imported here: the API only loads Celery once it publishes a task
+    from celery.signals import (
+        after_task_publish,
+        before_task_publish,
+        task_postrun,
+        task_prerun,
+    )
+
+    before_task_publish.connect(_before_task_publish, weak=False)
+    after_task_publish.connect(_after_task_publish, weak=False)
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
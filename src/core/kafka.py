@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# "kafka", or "memory" for tests and local runs without a Kafka cluster
+EVENT_BROKER_BACKEND = os.getenv("EVENT_BROKER_BACKEND", "kafka")
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+KAFKA_TOPIC_PREFIX = os.getenv("KAFKA_TOPIC_PREFIX", "musicevent.")
+# Records wait up to KAFKA_LINGER_MS to fill KAFKA_BATCH_SIZE-byte batches
+# per partition: fewer, larger, compressed requests
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "20"))
+KAFKA_BATCH_SIZE = int(os.getenv("KAFKA_BATCH_SIZE", str(64 * 1024)))
+KAFKA_COMPRESSION_TYPE = os.getenv("KAFKA_COMPRESSION_TYPE", "gzip")
+KAFKA_FLUSH_TIMEOUT_SECONDS = float(os.getenv("KAFKA_FLUSH_TIMEOUT_SECONDS", "30"))
+# With Kafka down, a publish run gives up after this instead of holding a
+# worker for the client's default 30s (the events wait for the next run)
+KAFKA_CONNECT_TIMEOUT_SECONDS = float(os.getenv("KAFKA_CONNECT_TIMEOUT_SECONDS", "5"))
+
+# Keyed by audio id, so each audio's events stay in order on one partition
+AUDIOS_TOPIC = f"{KAFKA_TOPIC_PREFIX}audios"
+# Keyed by event id
+EVENTS_TOPIC = f"{KAFKA_TOPIC_PREFIX}events"
+
+
+@dataclass(frozen=True)
+class EventRecord:
+    topic: str
+    key: str
+    value: bytes
+    headers: tuple[tuple[str, bytes], ...] = ()
+
+
+class EventBroker(ABC):
+    @abstractmethod
+    def publish(self, records: list[EventRecord]) -> list[Exception | None]:
+        # Sends the whole batch and waits for it: one error (or None) per
+        # record, in order
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class KafkaEventBroker(EventBroker):
+    def __init__(self, bootstrap_servers: str):
+        # Imported here: only the publishing worker needs the client
+        from kafka import KafkaProducer
+
+        self._producer = KafkaProducer(
+            bootstrap_servers=bootstrap_servers.split(","),
+            # Retries are deduplicated by the broker and keep their order
+            # within a partition; requires acks from all in-sync replicas
+            enable_idempotence=True,
+            acks="all",
+            linger_ms=KAFKA_LINGER_MS,
+            batch_size=KAFKA_BATCH_SIZE,
+            compression_type=KAFKA_COMPRESSION_TYPE or None,
+            bootstrap_timeout_ms=int(KAFKA_CONNECT_TIMEOUT_SECONDS * 1000),
+            max_block_ms=int(KAFKA_CONNECT_TIMEOUT_SECONDS * 1000),
+        )
+
+    def publish(self, records: list[EventRecord]) -> list[Exception | None]:
+        # send() only appends to the producer's batches; the background
+        # sender ships them while the rest are queued
+        futures = [
+            self._producer.send(
+                record.topic,
+                key=record.key.encode(),
+                value=record.value,
+                headers=list(record.headers),
+            )
+            for record in records
+        ]
+        try:
+            self._producer.flush(timeout=KAFKA_FLUSH_TIMEOUT_SECONDS)
+        except Exception:
+            # Not raised: whatever was not acknowledged in time is reported
+            # per record below
+            logger.exception("Kafka producer flush failed")
+        results = []
+        for future in futures:
+            if not future.is_done:
+                results.append(
+                    TimeoutError("Not acknowledged before the flush timeout")
+                )
+            else:
+                results.append(future.exception if future.failed() else None)
+        return results
+
+    def close(self) -> None:
+        self._producer.close(timeout=KAFKA_FLUSH_TIMEOUT_SECONDS)
+
+
+class InMemoryEventBroker(EventBroker):
+    # Stand-in for Kafka: keeps every published record, in order
+    def __init__(self):
+        self.records: list[EventRecord] = []
+        self._lock = threading.Lock()
+
+    def publish(self, records: list[EventRecord]) -> list[Exception | None]:
+        with self._lock:
+            self.records.extend(records)
+        return [None] * len(records)
+
+    def messages(self, topic: str | None = None) -> list[dict]:
+        # Decoded values, e.g. to assert on the events a test produced
+        with self._lock:
+            return [
+                json.loads(record.value)
+                for record in self.records
+                if topic is None or record.topic == topic
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+
+_event_broker: EventBroker | None = None
+
+
+def get_event_broker() -> EventBroker:
+    # Created on first use, so each Celery prefork child gets its own producer
+    # (its sender thread does not survive a fork)
+    global _event_broker
+    if _event_broker is None:
+        if EVENT_BROKER_BACKEND == "memory":
+            _event_broker = InMemoryEventBroker()
+        elif EVENT_BROKER_BACKEND == "kafka":
+            _event_broker = KafkaEventBroker(KAFKA_BOOTSTRAP_SERVERS)
+        else:
+            raise ValueError(f"Unknown event broker backend: {EVENT_BROKER_BACKEND}")
+    return _event_broker
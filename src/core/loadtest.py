@@ -0,0 +1,111 @@
+# Closed-loop load test against a running API, to compare how many
+# concurrent requests one worker sustains (httpx is in requirements-dev.txt).
+# Run the build under test and a baseline build (e.g. the previous release)
+# side by side, one worker each, against the same database and Redis:
+#   uvicorn src.main:app --workers 1 --port 8000 &
+#   (cd ../baseline && uvicorn src.main:app --workers 1 --port 8001 &)
+#   python -m src.core.loadtest --concurrency 1 10 50 100 --duration 20 \
+#       --baseline-url http://localhost:8001 \
+#       --path /audios/ --path /events/ --token "$ACCESS_TOKEN"
+# Prints one JSON line per concurrency level, with both results and the
+# throughput ratio. Throughput that keeps growing with concurrency, at flat
+# latency, means the event loop is not blocked; with blocking I/O it plateaus
+# at one request per worker at a time.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def compare(baseline: dict, candidate: dict) -> dict:
+    return {
+        "concurrency": candidate["concurrency"],
+        "baseline": baseline,
+        "candidate": candidate,
+        "throughput_ratio": round(
+            candidate["requests_per_second"]
+            / max(baseline["requests_per_second"], 0.1),
+            2,
+        ),
+        "p95_ratio": round(candidate["p95_ms"] / max(baseline["p95_ms"], 0.1), 2),
+    }
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percentile), len(values) - 1)]
+
+
+async def run(
+    base_url: str,
+    paths: list[str],
+    concurrency: int,
+    duration: float,
+    token: str | None = None,
+) -> dict:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client: httpx.AsyncClient, offset: int) -> None:
+        # Each simulated client sends its next request once the last returned
+        sent = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(paths[sent % len(paths)])
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            sent += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=30
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0,
+        "statuses": statuses,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--token", help="access token, for authenticated routes")
+    parser.add_argument(
+        "--baseline-url", help="also load this deployment and compare the two"
+    )
+    args = parser.parse_args()
+
+    def load(url: str, concurrency: int) -> dict:
+        return asyncio.run(
+            run(url, args.paths or ["/healthz"], concurrency, args.duration, args.token)
+        )
+
+    for concurrency in args.concurrency:
+        result = load(args.url, concurrency)
+        if args.baseline_url:
+            result = compare(load(args.baseline_url, concurrency), result)
+        print(json.dumps(result), flush=True)
@@ -0,0 +1,208 @@
+import os
+import time
+from collections.abc import Callable
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Set when running several worker processes (uvicorn --workers, Celery
+# prefork): each process writes its samples there and a scrape of any one
+# process aggregates all of them. The directory must be emptied on startup.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_COLLECT_INTERVAL_SECONDS = float(
+    os.getenv("METRICS_COLLECT_INTERVAL_SECONDS", "5")
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by layer and result", ["layer", "result"]
+)
+L1_CACHE_BYTES = Gauge(
+    "l1_cache_bytes",
+    "Approximate size of the in-process cache's keys and values",
+    multiprocess_mode="livesum",
+)
+L1_CACHE_ENTRIES = Gauge(
+    "l1_cache_entries", "Entries in the in-process cache", multiprocess_mode="livesum"
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections opened beyond pool_size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Connection checkouts that timed out", ["pool"]
+)
+REDIS_POOL_IN_USE = Gauge(
+    "redis_pool_in_use",
+    "Redis connections currently in use",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_AVAILABLE = Gauge(
+    "redis_pool_available",
+    "Idle Redis connections",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_MAX = Gauge(
+    "redis_pool_max",
+    "Maximum Redis connections",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "bcrypt jobs queued or running",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time from submitting a bcrypt job to its completion",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "bcrypt jobs rejected because the queue was full"
+)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Request latency, until the last body chunk is sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Time spent executing a single SQL statement",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_seconds_per_request",
+    "Time spent in SQL statements while serving a request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_N_PLUS_ONE = Counter(
+    "db_n_plus_one_total",
+    "Requests repeating the same SQL statement past the N+1 threshold",
+    ["route"],
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Redis command round trip",
+    ["pool", "command"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+CELERY_PUBLISH_SECONDS = Histogram(
+    "celery_publish_seconds",
+    "Time to hand a task to the broker",
+    ["task"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+CELERY_TASK_SECONDS = Histogram(
+    "celery_task_seconds",
+    "Task run time in the worker",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+HTTP_REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected with 503 by admission control",
+    ["reason"],
+)
+APP_STARTUP_SECONDS = Gauge(
+    "app_startup_seconds",
+    "Time spent in each startup phase of the slowest live API process",
+    ["phase"],
+    multiprocess_mode="livemax",
+)
+
+# Callbacks refreshing point-in-time gauges right before a scrape
+_collectors: list[Callable[[], None]] = []
+_last_collected = 0.0
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    _collectors.append(collector)
+
+
+def refresh_collectors(force: bool = False) -> None:
+    # In multiprocess mode only the scraped process would run the collectors
+    # at scrape time, so every process also refreshes its own gauges as it
+    # serves requests
+    global _last_collected
+    now = time.monotonic()
+    if not force and now - _last_collected < METRICS_COLLECT_INTERVAL_SECONDS:
+        return
+    _last_collected = now
+    for collector in _collectors:
+        collector()
+
+
+def metrics_registry() -> CollectorRegistry:
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead(pid: int) -> None:
+    # Drops the exiting process's live gauges from the aggregate
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    refresh_collectors(force=True)
+    return Response(
+        content=generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
@@ -1,22 +1,103 @@
 import os
+import time
 from typing import Annotated
 
 from fastapi import Depends
-from redis import Redis
+from redis import BlockingConnectionPool, Redis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
 
-_redis_client: Redis | None = None
+from .metrics import (
+    REDIS_COMMAND_SECONDS,
+    REDIS_POOL_AVAILABLE,
+    REDIS_POOL_IN_USE,
+    REDIS_POOL_MAX,
+    register_collector,
+)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+_redis_client: AsyncRedis | None = None
+_sync_redis_client: Redis | None = None
 
 CACHE_TTL_SECONDS = 300
-AUDIOS_LIST_CACHE_KEY = "audios:all"
-AUDIOS_LIST_CACHE_TTL_SECONDS = 60
 
 
-def get_redis() -> Redis:
+def _pool_options(prefix: str, max_connections: str) -> dict:
+    # REDIS_* for the API, WORKER_REDIS_* for Celery workers
+    return {
+        "max_connections": int(os.getenv(f"{prefix}MAX_CONNECTIONS", max_connections)),
+        # How long to wait for a free connection before raising
+        "timeout": float(os.getenv(f"{prefix}POOL_TIMEOUT_SECONDS", "5")),
+        "socket_timeout": float(os.getenv(f"{prefix}SOCKET_TIMEOUT_SECONDS", "5")),
+        "socket_connect_timeout": float(
+            os.getenv(f"{prefix}SOCKET_CONNECT_TIMEOUT_SECONDS", "2")
+        ),
+        "health_check_interval": int(
+            os.getenv(f"{prefix}HEALTH_CHECK_INTERVAL_SECONDS", "30")
+        ),
+    }
+
+
+API_REDIS_POOL_OPTIONS = _pool_options("REDIS_", "50")
+WORKER_REDIS_POOL_OPTIONS = _pool_options("WORKER_REDIS_", "10")
+
+
+# Time every command; pipelines and pub/sub go through other paths
+class TimedAsyncRedis(AsyncRedis):
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("api", str(args[0]).upper()).observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedRedis(Redis):
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("worker", str(args[0]).upper()).observe(
+                time.perf_counter() - start
+            )
+
+
+def get_redis() -> AsyncRedis:
     global _redis_client
     if _redis_client is None:
-        url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-        _redis_client = Redis.from_url(url, decode_responses=True)
+        pool = AsyncBlockingConnectionPool.from_url(
+            REDIS_URL, decode_responses=True, **API_REDIS_POOL_OPTIONS
+        )
+        _redis_client = TimedAsyncRedis(connection_pool=pool)
     return _redis_client
 
 
-RedisClient = Annotated[Redis, Depends(get_redis)]
+# Blocking client for Celery tasks, which run outside the event loop
+def get_sync_redis() -> Redis:
+    global _sync_redis_client
+    if _sync_redis_client is None:
+        pool = BlockingConnectionPool.from_url(
+            REDIS_URL, decode_responses=True, **WORKER_REDIS_POOL_OPTIONS
+        )
+        _sync_redis_client = TimedRedis(connection_pool=pool)
+    return _sync_redis_client
+
+
+def _collect_pool_stats() -> None:
+    if _redis_client is None:
+        return
+    pool = _redis_client.connection_pool
+    REDIS_POOL_MAX.labels("api").set(pool.max_connections)
+    REDIS_POOL_IN_USE.labels("api").set(len(getattr(pool, "_in_use_connections", ())))
+    REDIS_POOL_AVAILABLE.labels("api").set(
+        len(getattr(pool, "_available_connections", ()))
+    )
+
+
+register_collector(_collect_pool_stats)
+
+RedisClient = Annotated[AsyncRedis, Depends(get_redis)]
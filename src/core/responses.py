@@ -0,0 +1,28 @@
+import hashlib
+
+from fastapi import Response
+
+CACHED_JSON_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+# Cache entries are stored as '<etag>\n<json body>' so a hit can be served
+# without hashing, parsing or re-validating the body
+def pack_json(body: str) -> str:
+    digest = hashlib.blake2b(body.encode("utf-8"), digest_size=16).hexdigest()
+    return f'"{digest}"\n{body}'
+
+
+def cached_json_response(entry: str, if_none_match: str | None = None) -> Response:
+    etag, _, body = entry.partition("\n")
+    headers = {"ETag": etag, "Cache-Control": CACHED_JSON_CACHE_CONTROL}
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -4,10 +4,16 @@ from src.users.controller import router as users_router
 from src.auth.controller import router as auth_router
 from src.events.controller import router as events_router
 from src.audios.controller import router as audios_router
+from src.core.metrics import router as metrics_router
+from src.core.health import router as health_router
+from src.rate_limiting import RateLimited
 
 
 def register_routes(app: FastAPI):
-    app.include_router(users_router)
-    app.include_router(auth_router)
-    app.include_router(events_router)
-    app.include_router(audios_router)
+    # Every API route is checked against the RATE_LIMITS table
+    app.include_router(users_router, dependencies=[RateLimited])
+    app.include_router(auth_router, dependencies=[RateLimited])
+    app.include_router(events_router, dependencies=[RateLimited])
+    app.include_router(audios_router, dependencies=[RateLimited])
+    app.include_router(metrics_router)
+    app.include_router(health_router)
@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from sqlalchemy import text
+
+from .metrics import APP_STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Connections opened before serving so the first requests do not pay for
+# connecting; capped by the pool sizes
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "5"))
+REDIS_WARMUP_CONNECTIONS = int(os.getenv("REDIS_WARMUP_CONNECTIONS", "5"))
+
+
+async def _warm_db() -> None:
+    from ..database.database import API_POOL_OPTIONS, DB_PGBOUNCER, async_engine
+
+    if DB_PGBOUNCER:
+        # No application-side pool to fill
+        return
+
+    async def connect():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # Held concurrently, so each one opens its own pooled connection
+    count = min(DB_WARMUP_CONNECTIONS, API_POOL_OPTIONS["pool_size"])
+    await asyncio.gather(*(connect() for _ in range(count)))
+
+
+async def _warm_redis() -> None:
+    from .redis import API_REDIS_POOL_OPTIONS, get_redis
+
+    redis = get_redis()
+    count = min(REDIS_WARMUP_CONNECTIONS, API_REDIS_POOL_OPTIONS["max_connections"])
+    await asyncio.gather(*(redis.ping() for _ in range(count)))
+
+
+async def _warm_token_verifier() -> None:
+    from ..auth.tokens import get_token_verifier
+
+    # Raises on a broken JWT configuration: better at startup than per request
+    get_token_verifier()
+
+
+async def warm_up() -> None:
+    start = time.perf_counter()
+    await _warm_token_verifier()
+    results = await asyncio.gather(_warm_db(), _warm_redis(), return_exceptions=True)
+    for name, result in zip(("database", "redis"), results):
+        if isinstance(result, Exception):
+            # Not fatal: the pools still connect on demand
+            logger.warning("Could not warm up %s: %s", name, result)
+    elapsed = time.perf_counter() - start
+    APP_STARTUP_SECONDS.labels("warmup").set(elapsed)
+    logger.info("Warmed up in %.3fs", elapsed)
+
+
+def record_import_time(started_at: float) -> None:
+    APP_STARTUP_SECONDS.labels("import").set(time.perf_counter() - started_at)
+
+
+# Run in a fresh interpreter per sample: imports are cached after the first
+_PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+startup = None
+if {lifespan}:
+    async def run():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter() - imported
+    startup = asyncio.run(run())
+print(json.dumps({{"import": imported - start, "startup": startup}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> list[tuple[float, str]]:
+    # "import time: self [us] | cumulative | imported package"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.append((int(cumulative) / 1e6, name.rstrip()))
+    return modules
+
+
+def benchmark(runs: int, lifespan: bool) -> tuple[dict, list[tuple[float, str]]]:
+    samples: dict[str, list[float]] = {"import": [], "startup": []}
+    modules: list[tuple[float, str]] = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                _PROBE.format(lifespan=lifespan),
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        for phase, seconds in timings.items():
+            if seconds is not None:
+                samples[phase].append(seconds)
+        modules = _parse_importtime(result.stderr)
+
+    summary = {
+        phase: {
+            "median": round(statistics.median(values), 4),
+            "min": round(min(values), 4),
+            "max": round(max(values), 4),
+        }
+        for phase, values in samples.items()
+        if values
+    }
+    return {"runs": runs, **summary}, sorted(modules, reverse=True)
+
+
+if __name__ == "__main__":
+    # python -m src.core.startup --runs 10 --top 20
+    # Prints one JSON line of timings (to track over time), then the slowest
+    # imports of the last run. --no-lifespan skips connecting to Postgres/Redis.
+    parser = argparse.ArgumentParser(description="Measure API cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-lifespan", action="store_true")
+    args = parser.parse_args()
+
+    summary, modules = benchmark(args.runs, lifespan=not args.no_lifespan)
+    print(json.dumps(summary))
+    for seconds, name in modules[: args.top]:
+        print(f"{seconds * 1000:9.1f} ms  {name}", file=sys.stderr)
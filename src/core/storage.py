@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Annotated, BinaryIO
+
+from fastapi import Depends
+
+BLOB_STORAGE_BACKEND = os.getenv("BLOB_STORAGE_BACKEND", "local")
+BLOB_STORAGE_PATH = os.getenv("BLOB_STORAGE_PATH", "/app/data/blobs")
+BLOB_CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", str(1024 * 1024)))
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    key: str
+    size: int
+    sha256: str
+    # False when identical content was already stored under the same key
+    created: bool
+
+
+class BlobStorage(ABC):
+    @abstractmethod
+    def put(self, stream: BinaryIO) -> StoredBlob: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def size(self, key: str) -> int: ...
+
+    @abstractmethod
+    def iter_chunks(
+        self,
+        key: str,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = BLOB_CHUNK_SIZE,
+    ) -> Iterator[bytes]: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    # Seekable filesystem path for tools that need random access (ffmpeg),
+    # or None when the backend can only stream
+    def local_path(self, key: str) -> str | None:
+        return None
+
+
+class LocalBlobStorage(BlobStorage):
+    # Content-addressed layout: <root>/<aa>/<bb>/<sha256>
+    def __init__(self, root: str, chunk_size: int = BLOB_CHUNK_SIZE):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self._tmp_dir = self.root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError(f"Invalid blob key: {key}")
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, stream: BinaryIO) -> StoredBlob:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(self.chunk_size):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+
+            key = digest.hexdigest()
+            path = self._path(key)
+            if path.exists():
+                os.unlink(tmp_name)
+                return StoredBlob(key=key, size=size, sha256=key, created=False)
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, path)
+            return StoredBlob(key=key, size=size, sha256=key, created=True)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def iter_chunks(
+        self,
+        key: str,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = BLOB_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        # end is inclusive, matching HTTP byte ranges
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                to_read = (
+                    chunk_size if remaining is None else min(chunk_size, remaining)
+                )
+                chunk = f.read(to_read)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> str | None:
+        return str(self._path(key))
+
+
+_BACKENDS = {
+    "local": lambda: LocalBlobStorage(BLOB_STORAGE_PATH),
+}
+
+_blob_storage: BlobStorage | None = None
+
+
+def get_blob_storage() -> BlobStorage:
+    global _blob_storage
+    if _blob_storage is None:
+        if BLOB_STORAGE_BACKEND not in _BACKENDS:
+            raise ValueError(f"Unknown blob storage backend: {BLOB_STORAGE_BACKEND}")
+        _blob_storage = _BACKENDS[BLOB_STORAGE_BACKEND]()
+    return _blob_storage
+
+
+BlobStore = Annotated[BlobStorage, Depends(get_blob_storage)]
@@ -1,26 +1,188 @@
+import time
 from typing import Annotated
+from uuid import uuid4
 from fastapi import Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
 from dotenv import load_dotenv
 
+from ..core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT_SECONDS,
+    register_collector,
+)
+from ..core.instrumentation import instrument_engine
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Transaction-pooling PgBouncer: no server-side prepared statement reuse and
+# no application-side pool on top of PgBouncer's own
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+
+class _InstrumentedPoolMixin:
+    # Times how long each checkout waits for a free connection
+    pool_name = "default"
+    _recent_wait = 0.0
+    _recent_wait_at = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.pool_name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_POOL_WAIT_SECONDS.labels(self.pool_name).observe(elapsed)
+            self._recent_wait = 0.8 * self._recent_wait + 0.2 * elapsed
+            self._recent_wait_at = time.monotonic()
+
+    def recent_wait_seconds(self, max_age_seconds: float) -> float:
+        # Smoothed checkout wait, for admission control. Stale once no
+        # checkout happened for max_age_seconds, e.g. while load is shed.
+        if time.monotonic() - self._recent_wait_at > max_age_seconds:
+            # Starts over from the next checkout rather than the stale average
+            self._recent_wait = 0.0
+            return 0.0
+        return self._recent_wait
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pool_name = "worker"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pool_name = "api"
+
+
+def _pool_options(prefix: str, defaults: dict[str, str]) -> dict:
+    # Reads <prefix>POOL_SIZE, <prefix>MAX_OVERFLOW, ... e.g. DB_POOL_SIZE or
+    # WORKER_DB_POOL_SIZE, so the API and Celery workers are sized separately
+    def setting(name: str) -> str:
+        return os.getenv(f"{prefix}{name}", defaults[name])
+
+    return {
+        "pool_size": int(setting("POOL_SIZE")),
+        "max_overflow": int(setting("MAX_OVERFLOW")),
+        "pool_recycle": int(setting("POOL_RECYCLE_SECONDS")),
+        "pool_pre_ping": setting("POOL_PRE_PING").lower() == "true",
+        "pool_timeout": float(setting("POOL_TIMEOUT_SECONDS")),
+    }
+
+
+API_POOL_OPTIONS = _pool_options(
+    "DB_",
+    {
+        "POOL_SIZE": "10",
+        "MAX_OVERFLOW": "10",
+        "POOL_RECYCLE_SECONDS": "1800",
+        "POOL_PRE_PING": "true",
+        "POOL_TIMEOUT_SECONDS": "10",
+    },
+)
+WORKER_POOL_OPTIONS = _pool_options(
+    "WORKER_DB_",
+    {
+        "POOL_SIZE": "2",
+        "MAX_OVERFLOW": "2",
+        "POOL_RECYCLE_SECONDS": "1800",
+        "POOL_PRE_PING": "true",
+        "POOL_TIMEOUT_SECONDS": "30",
+    },
+)
+DB_CONNECT_TIMEOUT_SECONDS = int(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "5"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+
+def _engine_options(url: str, pool_class, pool_options: dict) -> dict:
+    options: dict = {}
+    connect_args: dict = {}
+    driver = make_url(url).get_driver_name()
+    if driver == "asyncpg":
+        connect_args["timeout"] = DB_CONNECT_TIMEOUT_SECONDS
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+            }
+        if DB_PGBOUNCER:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = (
+                lambda: f"__asyncpg_{uuid4()}__"
+            )
+    elif driver == "psycopg2":
+        connect_args["connect_timeout"] = DB_CONNECT_TIMEOUT_SECONDS
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    if connect_args:
+        options["connect_args"] = connect_args
+
+    if DB_PGBOUNCER:
+        options["poolclass"] = NullPool
+    else:
+        options["poolclass"] = pool_class
+        options.update(pool_options)
+    return options
+
+
+# Sync engine: Celery workers and schema creation
+engine = create_engine(
+    DATABASE_URL,
+    **_engine_options(DATABASE_URL, InstrumentedQueuePool, WORKER_POOL_OPTIONS),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: the API request path
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool, API_POOL_OPTIONS),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
+instrument_engine(engine, "worker")
+instrument_engine(async_engine.sync_engine, "api")
+
+
+def _collect_pool_stats() -> None:
+    for name, pool in (("worker", engine.pool), ("api", async_engine.pool)):
+        if not isinstance(pool, QueuePool):
+            continue
+        DB_POOL_SIZE.labels(name).set(pool.size())
+        DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+
+register_collector(_collect_pool_stats)
+
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-DbSession = Annotated[Session, Depends(get_db)]
+DbSession = Annotated[AsyncSession, Depends(get_db)]
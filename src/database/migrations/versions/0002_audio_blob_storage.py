@@ -0,0 +1,38 @@
+"""Audio blob storage
+
+Uploads go to blob storage; only legacy rows keep their bytes in audios.file.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 13:52:17.102394
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.add_column(sa.Column("blob_key", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("size_bytes", sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column("sha256", sa.String(length=64), nullable=True))
+        batch_op.alter_column("file", existing_type=sa.LargeBinary(), nullable=True)
+        batch_op.create_index(op.f("ix_audios_sha256"), ["sha256"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.drop_index(op.f("ix_audios_sha256"))
+        # Fails while audios only stored in blob storage exist
+        batch_op.alter_column("file", existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.drop_column("sha256")
+        batch_op.drop_column("size_bytes")
+        batch_op.drop_column("blob_key")
@@ -0,0 +1,28 @@
+"""Audio content type
+
+Content-Type of the upload, served back on download.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 13:52:17.215837
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("audios", sa.Column("content_type", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.drop_column("content_type")
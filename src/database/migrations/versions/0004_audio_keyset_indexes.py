@@ -0,0 +1,45 @@
+"""Audio keyset indexes
+
+Composite indexes for the keyset-paginated audio listings; the event_id
+prefix of ix_audios_event_id_created_at_id replaces ix_audios_event_id.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:52:17.331046
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_audios_created_at_id", "audios", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_audios_status_created_at_id",
+        "audios",
+        ["status", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_audios_event_id_created_at_id",
+        "audios",
+        ["event_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_audios_event_id"), table_name="audios")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_audios_event_id"), "audios", ["event_id"], unique=False)
+    op.drop_index("ix_audios_event_id_created_at_id", table_name="audios")
+    op.drop_index("ix_audios_status_created_at_id", table_name="audios")
+    op.drop_index("ix_audios_created_at_id", table_name="audios")
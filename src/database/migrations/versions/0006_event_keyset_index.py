@@ -0,0 +1,28 @@
+"""Event keyset index
+
+Index for the keyset-paginated event listing.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:52:17.560274
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0006"
+down_revision: str | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_created_at_id", "events", ["created_at", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_created_at_id", table_name="events")
@@ -0,0 +1,31 @@
+"""Track play offsets
+
+Where in the audio each track was identified, and how confidently.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 13:52:17.671902
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0007"
+down_revision: str | None = "0006"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("track_plays") as batch_op:
+        batch_op.add_column(sa.Column("start_offset", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("confidence", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("track_plays") as batch_op:
+        batch_op.drop_column("confidence")
+        batch_op.drop_column("start_offset")
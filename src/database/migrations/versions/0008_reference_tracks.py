@@ -0,0 +1,40 @@
+"""Reference tracks
+
+Catalogue of the tracks whose fingerprints are in the lookup index.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 13:52:17.783355
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008"
+down_revision: str | None = "0007"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reference_tracks",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("artist", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_reference_tracks_sha256"), "reference_tracks", ["sha256"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reference_tracks_sha256"), table_name="reference_tracks")
+    op.drop_table("reference_tracks")
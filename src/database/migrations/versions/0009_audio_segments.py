@@ -0,0 +1,38 @@
+"""Audio segments
+
+Progress of audios processed as parallel segments.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 13:52:17.894718
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0009"
+down_revision: str | None = "0008"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.add_column(sa.Column("segments_total", sa.Integer(), nullable=True))
+        # The default fills existing rows; the app always sets the column
+        batch_op.add_column(
+            sa.Column("segments_done", sa.Integer(), server_default="0", nullable=False)
+        )
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.alter_column(
+            "segments_done", existing_type=sa.Integer(), server_default=None
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.drop_column("segments_done")
+        batch_op.drop_column("segments_total")
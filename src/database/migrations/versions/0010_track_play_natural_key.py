@@ -0,0 +1,43 @@
+"""Track play natural key
+
+Makes recording a segment's track plays idempotent across task retries.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 13:52:18.006153
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0010"
+down_revision: str | None = "0009"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        # Retried segments may already have recorded the same play twice
+        op.execute("""
+            DELETE FROM track_plays AS duplicate
+            USING track_plays AS kept
+            WHERE duplicate.audio_id = kept.audio_id
+              AND duplicate.start_offset = kept.start_offset
+              AND duplicate.title = kept.title
+              AND duplicate.id > kept.id
+            """)
+    with op.batch_alter_table("track_plays") as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_track_plays_audio_id_start_offset_title",
+            ["audio_id", "start_offset", "title"],
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("track_plays") as batch_op:
+        batch_op.drop_constraint(
+            "uq_track_plays_audio_id_start_offset_title", type_="unique"
+        )
@@ -0,0 +1,73 @@
+"""Processing leases and task outbox
+
+Leases let crashed processing be picked up again; outbox_messages holds
+Celery tasks committed with the rows that need them.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 13:52:18.117590
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0011"
+down_revision: str | None = "0010"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.add_column(
+            sa.Column("lease_owner", sa.String(length=64), nullable=True)
+        )
+        batch_op.add_column(sa.Column("lease_expires_at", sa.DateTime(), nullable=True))
+        # The default fills existing rows; the app always sets the column
+        batch_op.add_column(
+            sa.Column(
+                "processing_attempts",
+                sa.Integer(),
+                server_default="0",
+                nullable=False,
+            )
+        )
+        batch_op.create_index(
+            "ix_audios_status_lease_expires_at",
+            ["status", "lease_expires_at"],
+            unique=False,
+        )
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.alter_column(
+            "processing_attempts", existing_type=sa.Integer(), server_default=None
+        )
+    op.create_table(
+        "outbox_messages",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("task", sa.String(), nullable=False),
+        sa.Column("args", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_outbox_messages_available_at",
+        "outbox_messages",
+        ["available_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_messages_available_at", table_name="outbox_messages")
+    op.drop_table("outbox_messages")
+    with op.batch_alter_table("audios") as batch_op:
+        batch_op.drop_index("ix_audios_status_lease_expires_at")
+        batch_op.drop_column("processing_attempts")
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("lease_owner")
@@ -0,0 +1,8 @@
+# Every mapped model, so Base.metadata is complete (migrations) and string
+# relationships resolve (the app)
+from ..audios.models import Audio, TrackPlay  # noqa: F401
+from ..auth.models import RefreshToken  # noqa: F401
+from ..events.models import Event  # noqa: F401
+from ..fingerprints.models import ReferenceTrack  # noqa: F401
+from ..outbox.models import OutboxEvent, OutboxMessage  # noqa: F401
+from ..users.models import User  # noqa: F401
@@ -0,0 +1,32 @@
+from uuid import UUID
+
+EVENT_CACHE_TTL_SECONDS = 300
+EVENTS_PAGE_CACHE_TTL_SECONDS = 60
+
+# Tags:
+#   event:<id>   every cached entry that contains this event
+#   events:head  first page of the listing; new events land there
+
+
+def event_tag(event_id: UUID) -> str:
+    return f"event:{event_id}"
+
+
+def detail_key(event_id: UUID) -> str:
+    return f"events:detail:{event_id}"
+
+
+def page_key(limit: int, cursor: str | None) -> str:
+    return f"events:page:{cursor or 'head'}:{limit}"
+
+
+def page_tags(event_ids: list[UUID], cursor: str | None) -> list[str]:
+    tags = [event_tag(event_id) for event_id in event_ids]
+    if cursor is None:
+        tags.append("events:head")
+    return tags
+
+
+def audios_attached_tags(event_id: UUID) -> list[str]:
+    # Attaching audios changes the event's audio ids and count
+    return [event_tag(event_id), "events:head"]
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
-from .schemas import EventReadResponse
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Header, Query
+from .schemas import EventPageResponse, EventReadResponse
+from ..core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..core.redis import RedisClient
 from ..database.database import DbSession
 from .schemas import EventCreateRequest
 from . import service
@@ -9,10 +14,37 @@ router = APIRouter(prefix="/events", tags=["events"])
 
 
 @router.post("/", response_model=EventReadResponse)
-async def create(event: EventCreateRequest, db: DbSession, current_user: CurrentUser):
-    return service.create(db, event)
+async def create(
+    event: EventCreateRequest,
+    db: DbSession,
+    redis: RedisClient,
+    current_user: CurrentUser,
+):
+    return await service.create(db, redis, event)
+
+
+@router.get("/", response_model=EventPageResponse)
+async def get_all(
+    db: DbSession,
+    redis: RedisClient,
+    current_user: CurrentUser,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    return await service.get_all(
+        db=db, redis=redis, limit=limit, cursor=cursor, if_none_match=if_none_match
+    )
 
 
-@router.get("/", response_model=list[EventReadResponse])
-async def get_all(db: DbSession, current_user: CurrentUser):
-    return service.get_all(db)
+@router.get("/{event_id}", response_model=EventReadResponse)
+async def get_by_id(
+    event_id: UUID,
+    db: DbSession,
+    redis: RedisClient,
+    current_user: CurrentUser,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    return await service.get_by_id(
+        db=db, redis=redis, event_id=event_id, if_none_match=if_none_match
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, UUID, Enum
+from sqlalchemy import Column, String, DateTime, UUID, Enum, Index
 from datetime import datetime
 from enum import StrEnum
 from ..database.database import Base
@@ -21,5 +21,8 @@ class Event(Base):
 
     audios = relationship("Audio", back_populates="event")
 
+    # Keyset pagination on (created_at, id)
+    __table_args__ = (Index("ix_events_created_at_id", "created_at", "id"),)
+
     def __repr__(self):
         return f"Event(id={self.id}, name={self.name}, status={self.status}, created_at={self.created_at}, updated_at={self.updated_at})"
@@ -14,8 +14,14 @@ class EventReadResponse(BaseModel):
     name: str
     status: EventStatus
     audio_ids: list[UUID]
+    audio_count: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class EventPageResponse(BaseModel):
+    items: list[EventReadResponse]
+    next_cursor: str | None
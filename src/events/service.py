@@ -1,53 +1,186 @@
+from datetime import datetime
+
+from fastapi import Response
+from redis.asyncio import Redis
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import selectinload
+
+from ..core.kafka import AUDIOS_TOPIC, EVENTS_TOPIC
+from ..core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from ..core.responses import cached_json_response, pack_json
 from ..database.database import DbSession
-from .schemas import EventCreateRequest, EventReadResponse
+from ..outbox import service as outbox
+from . import cache as event_cache
+from .schemas import EventCreateRequest, EventPageResponse, EventReadResponse
 from .models import Event, EventStatus
+from src.audios import cache as audio_cache
 from src.audios.models import Audio, AudioStatus
-from src.exceptions import (
-    AudioAlreadyAttachedError,
-    AudioNotFoundError,
-    AudioNotProcessedError,
-)
-from uuid import uuid4
+from src.core.cache import get_or_build, invalidate_tags
+from src.exceptions import AudiosNotAttachableError, EventNotFoundError
+from uuid import UUID, uuid4
 
 
-def create(db: DbSession, event_request: EventCreateRequest) -> EventReadResponse:
+async def _not_attachable_error(
+    db: DbSession, audio_ids: list[UUID]
+) -> AudiosNotAttachableError:
+    rows = {
+        row.id: row
+        for row in await db.execute(
+            select(Audio.id, Audio.status, Audio.event_id).where(
+                Audio.id.in_(audio_ids)
+            )
+        )
+    }
+    not_found, not_processed, already_attached = [], [], []
+    for audio_id in audio_ids:
+        row = rows.get(audio_id)
+        if row is None:
+            not_found.append(audio_id)
+        elif row.status != AudioStatus.PROCESSED:
+            not_processed.append(audio_id)
+        else:
+            already_attached.append(audio_id)
+    return AudiosNotAttachableError(not_found, not_processed, already_attached)
+
+
+async def create(
+    db: DbSession, redis: Redis, event_request: EventCreateRequest
+) -> EventReadResponse:
+    audio_ids = list(dict.fromkeys(event_request.audio_ids))
     event = Event(id=uuid4(), name=event_request.name, status=EventStatus.DRAFT)
     db.add(event)
-    db.commit()
-    db.refresh(event)
-
-    for audio_id in event_request.audio_ids:
-        audio = db.query(Audio).filter(Audio.id == audio_id).first()
-        if not audio:
-            raise AudioNotFoundError(audio_id)
-        if audio.status != AudioStatus.PROCESSED:
-            raise AudioNotProcessedError(audio_id)
-        if audio.event_id is not None:
-            raise AudioAlreadyAttachedError(audio_id)
-        audio.event_id = event.id
-
-    db.commit()
-    db.refresh(event)
+    await db.flush()
+
+    if audio_ids:
+        # The WHERE clause is the validation: an audio attached or reprocessed
+        # by a concurrent request is simply not updated
+        result = await db.execute(
+            update(Audio)
+            .where(
+                Audio.id.in_(audio_ids),
+                Audio.event_id.is_(None),
+                Audio.status == AudioStatus.PROCESSED,
+            )
+            .values(event_id=event.id, updated_at=datetime.now())
+            .returning(Audio.id)
+            .execution_options(synchronize_session=False)
+        )
+        attached = set(result.scalars())
+        rejected = [audio_id for audio_id in audio_ids if audio_id not in attached]
+        if rejected:
+            error = await _not_attachable_error(db, rejected)
+            await db.rollback()
+            raise error
+
+    outbox.record_event(
+        db,
+        EVENTS_TOPIC,
+        "event.created",
+        event.id,
+        {
+            "event_id": event.id,
+            "name": event.name,
+            "status": event.status,
+            "audio_ids": audio_ids,
+        },
+    )
+    for audio_id in audio_ids:
+        # On the audios topic, in order with that audio's other events
+        outbox.record_event(
+            db,
+            AUDIOS_TOPIC,
+            "audio.attached",
+            audio_id,
+            {"audio_id": audio_id, "event_id": event.id},
+        )
+    await db.commit()
+    await invalidate_tags(
+        redis,
+        audio_cache.attached_tags(audio_ids, event.id)
+        + event_cache.audios_attached_tags(event.id),
+    )
+    return _to_response(event, audio_ids)
+
+
+def _to_response(event: Event, audio_ids: list[UUID]) -> EventReadResponse:
     return EventReadResponse(
         id=event.id,
         name=event.name,
         status=event.status,
-        audio_ids=[audio.id for audio in event.audios],
+        audio_ids=audio_ids,
+        audio_count=len(audio_ids),
         created_at=event.created_at,
         updated_at=event.updated_at,
     )
 
 
-def get_all(db: DbSession) -> list[EventReadResponse]:
-    events = db.query(Event).all()
-    return [
-        EventReadResponse(
-            id=event.id,
-            name=event.name,
-            status=event.status,
-            audio_ids=[audio.id for audio in event.audios],
-            created_at=event.created_at,
-            updated_at=event.updated_at,
+def _with_audio_ids(query):
+    # One select-in query for the whole page, loading only the audio ids
+    return query.options(selectinload(Event.audios).load_only(Audio.id))
+
+
+async def _load_page(
+    db: DbSession, limit: int, cursor: str | None
+) -> EventPageResponse:
+    query = _with_audio_ids(select(Event))
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Event.created_at, Event.id) < tuple_(cursor_created_at, cursor_id)
         )
-        for event in events
-    ]
+    query = query.order_by(Event.created_at.desc(), Event.id.desc()).limit(limit + 1)
+    events = list((await db.execute(query)).scalars())
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].created_at, events[-1].id)
+    return EventPageResponse(
+        items=[
+            _to_response(event, [audio.id for audio in event.audios])
+            for event in events
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+async def get_all(
+    db: DbSession,
+    redis: Redis,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    if_none_match: str | None = None,
+) -> Response:
+    async def build() -> tuple[str, list[str]]:
+        page = await _load_page(db, limit, cursor)
+        tags = event_cache.page_tags([item.id for item in page.items], cursor)
+        return pack_json(page.model_dump_json()), tags
+
+    entry = await get_or_build(
+        redis,
+        event_cache.page_key(limit, cursor),
+        build,
+        event_cache.EVENTS_PAGE_CACHE_TTL_SECONDS,
+    )
+    return cached_json_response(entry, if_none_match)
+
+
+async def get_by_id(
+    db: DbSession, redis: Redis, event_id: UUID, if_none_match: str | None = None
+) -> Response:
+    async def build() -> tuple[str, list[str]]:
+        event = (
+            await db.execute(_with_audio_ids(select(Event).where(Event.id == event_id)))
+        ).scalar_one_or_none()
+        if not event:
+            raise EventNotFoundError(event_id)
+        response = _to_response(event, [audio.id for audio in event.audios])
+        return pack_json(response.model_dump_json()), [event_cache.event_tag(event_id)]
+
+    entry = await get_or_build(
+        redis,
+        event_cache.detail_key(event_id),
+        build,
+        event_cache.EVENT_CACHE_TTL_SECONDS,
+    )
+    return cached_json_response(entry, if_none_match)
@@ -20,6 +20,16 @@ class AudioError(HTTPException):
     pass
 
 
+class InvalidCursorError(HTTPException):
+    def __init__(self, cursor: str):
+        super().__init__(status_code=400, detail=f"Invalid pagination cursor {cursor}")
+
+
+class RateLimitExceededError(HTTPException):
+    def __init__(self, headers: dict[str, str]):
+        super().__init__(status_code=429, detail="Too many requests", headers=headers)
+
+
 class UserNotFoundError(UserError):
     def __init__(self, user_id: None):
         message = (
@@ -43,6 +53,15 @@ class AuthenticationError(UserError):
         super().__init__(status_code=401, detail=message)
 
 
+class PasswordHashingBusyError(UserError):
+    def __init__(self, retry_after_seconds: int):
+        super().__init__(
+            status_code=503,
+            detail="Authentication is temporarily overloaded, please retry",
+            headers={"Retry-After": str(retry_after_seconds)},
+        )
+
+
 class UserAlreadyExistsError(UserError):
     def __init__(self, email: str):
         super().__init__(
@@ -60,17 +79,34 @@ class AudioNotFoundError(AudioError):
         super().__init__(status_code=404, detail=f"Audio with id {audio_id} not found")
 
 
-class AudioNotProcessedError(AudioError):
-    def __init__(self, audio_id: UUID):
+class AudiosNotAttachableError(AudioError):
+    def __init__(
+        self,
+        not_found: list[UUID],
+        not_processed: list[UUID],
+        already_attached: list[UUID],
+    ):
+        problems = [
+            f"{reason}: {', '.join(str(audio_id) for audio_id in audio_ids)}"
+            for reason, audio_ids in (
+                ("not found", not_found),
+                ("not processed yet", not_processed),
+                ("already attached to an event", already_attached),
+            )
+            if audio_ids
+        ]
         super().__init__(
-            status_code=400, detail=f"Audio {audio_id} is not processed yet"
+            status_code=400,
+            detail=f"Audios cannot be attached ({'; '.join(problems)})",
         )
 
 
-class AudioAlreadyAttachedError(AudioError):
-    def __init__(self, audio_id: UUID):
+class AudioRangeNotSatisfiableError(AudioError):
+    def __init__(self, size: int):
         super().__init__(
-            status_code=400, detail=f"Audio {audio_id} is already attached to an event"
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
         )
 
 
@@ -89,6 +125,7 @@ def register_exception_handlers(app: FastAPI) -> None:
                 "error": error_name,
                 "message": exc.detail,
             },
+            headers=exc.headers,
         )
 
     @app.exception_handler(HTTPException)
@@ -100,6 +137,7 @@ def register_exception_handlers(app: FastAPI) -> None:
                 "error": exc.__class__.__name__,
                 "message": exc.detail,
             },
+            headers=exc.headers,
         )
 
     @app.exception_handler(RequestValidationError)
@@ -0,0 +1,140 @@
+# Throughput of track identification, in seconds of audio per CPU second:
+#   python -m src.fingerprints.benchmark [--tracks 20] [--minutes 30] [--decode]
+# Runs against a synthetic catalogue, so it needs neither the database nor a
+# real index. --decode also writes the set to a WAV file and runs the full
+# identify() on it, ffmpeg included (its CPU time is counted).
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import wave
+from collections.abc import Iterator
+
+import numpy as np
+
+from .decoder import SAMPLE_RATE
+from .fingerprint import fingerprint
+from .index import FingerprintIndex
+from .pipeline import (
+    FINGERPRINT_HOP_SECONDS,
+    FINGERPRINT_WINDOW_SECONDS,
+    identify,
+    identify_windows,
+)
+
+TRACK_SECONDS = 180.0
+
+
+def _track(track_id: int) -> np.ndarray:
+    # Deterministic per track, so the set can be rebuilt track by track
+    # instead of being held in memory
+    rng = np.random.default_rng(track_id)
+    return (0.1 * rng.standard_normal(int(TRACK_SECONDS * SAMPLE_RATE))).astype(
+        np.float32
+    )
+
+
+def _catalogue(tracks: int) -> FingerprintIndex:
+    hashes, track_ids, offsets = [], [], []
+    for track_id in range(1, tracks + 1):
+        track_hashes, track_offsets = fingerprint(_track(track_id))
+        hashes.append(track_hashes)
+        track_ids.append(np.full(len(track_hashes), track_id, np.int32))
+        offsets.append(track_offsets.astype(np.int32))
+    return FingerprintIndex.build(
+        np.concatenate(hashes), np.concatenate(track_ids), np.concatenate(offsets)
+    )
+
+
+def _set(tracks: int, seconds: float) -> Iterator[np.ndarray]:
+    # The catalogue's tracks back to back, with a little noise on top
+    rng = np.random.default_rng(0)
+    played = 0
+    track_id = 1
+    while played < seconds:
+        samples = _track(track_id)[: int((seconds - played) * SAMPLE_RATE)]
+        yield samples + (0.01 * rng.standard_normal(len(samples))).astype(np.float32)
+        played += len(samples) / SAMPLE_RATE
+        track_id = track_id % tracks + 1
+
+
+def _windows(tracks: int, seconds: float) -> Iterator[tuple[float, np.ndarray]]:
+    # Same windows as decode_windows, without ffmpeg
+    window = int(FINGERPRINT_WINDOW_SECONDS * SAMPLE_RATE)
+    hop = int(FINGERPRINT_HOP_SECONDS * SAMPLE_RATE)
+    samples = np.empty(0, np.float32)
+    start = 0
+    for chunk in _set(tracks, seconds):
+        samples = np.concatenate((samples, chunk))
+        while len(samples) >= window:
+            yield start / SAMPLE_RATE, samples[:window]
+            samples = samples[hop:]
+            start += hop
+    if len(samples) > window - hop:
+        yield start / SAMPLE_RATE, samples
+
+
+def _write_wav(path: str, tracks: int, seconds: float) -> None:
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        for samples in _set(tracks, seconds):
+            f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def _cpu_seconds() -> float:
+    # This process and its finished children (ffmpeg)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _run(identify_call) -> dict:
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    plays, audio_seconds = identify_call()
+    cpu_seconds = _cpu_seconds() - cpu_start
+    return {
+        "audio_seconds": round(audio_seconds, 1),
+        "cpu_seconds": round(cpu_seconds, 2),
+        "wall_seconds": round(time.perf_counter() - wall_start, 2),
+        "audio_seconds_per_cpu_second": round(audio_seconds / cpu_seconds, 1),
+        "plays": len(plays),
+    }
+
+
+def benchmark(tracks: int, minutes: float, decode: bool) -> dict:
+    seconds = minutes * 60
+    start = time.perf_counter()
+    index = _catalogue(tracks)
+    results = {
+        "tracks": tracks,
+        "catalogue_seconds": round(time.perf_counter() - start, 2),
+        "postings": len(index.tracks),
+        "expected_plays": int(np.ceil(seconds / TRACK_SECONDS)),
+        "fingerprint_and_match": _run(
+            lambda: identify_windows(_windows(tracks, seconds), index)
+        ),
+    }
+    if decode:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "set.wav")
+            _write_wav(path, tracks, seconds)
+            results["end_to_end"] = _run(lambda: identify(path, index))
+    # Stays flat as --minutes grows: windows are streamed, never the whole set
+    results["peak_rss_mb"] = round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure identification throughput")
+    parser.add_argument("--tracks", type=int, default=20)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--decode", action="store_true")
+    args = parser.parse_args()
+
+    print(json.dumps(benchmark(args.tracks, args.minutes, args.decode)))
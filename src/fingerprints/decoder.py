@@ -0,0 +1,135 @@
+import os
+import subprocess
+import threading
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+# Mono, low sample rate: fingerprints only use the band below ~5.5 kHz
+SAMPLE_RATE = 11025
+
+
+class DecodeError(Exception):
+    pass
+
+
+def _feed(stdin, chunks: Iterable[bytes]) -> None:
+    try:
+        for chunk in chunks:
+            stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        # ffmpeg exited early; its exit status reports why
+        pass
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def probe_duration(path: str) -> float | None:
+    result = subprocess.run(
+        [
+            FFPROBE_BINARY,
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def decode_windows(
+    source: str | Iterable[bytes],
+    window_seconds: float,
+    hop_seconds: float,
+    start_seconds: float = 0.0,
+    duration_seconds: float | None = None,
+) -> Iterator[tuple[float, np.ndarray]]:
+    # Yields (start_seconds, float32 samples) windows of window_seconds, every
+    # hop_seconds. Only one window is held in memory whatever the file length.
+    # source is a seekable file path or a stream of chunks; a segment
+    # (start_seconds, duration_seconds) of a path is seeked to directly.
+    window = int(window_seconds * SAMPLE_RATE)
+    hop = int(hop_seconds * SAMPLE_RATE)
+    segment = []
+    if start_seconds:
+        segment += ["-ss", str(start_seconds)]
+    if duration_seconds is not None:
+        segment += ["-t", str(duration_seconds)]
+    if isinstance(source, str):
+        input_args = [*segment, "-i", source]
+        output_args = []
+    else:
+        input_args = ["-i", "pipe:0"]
+        output_args = segment
+    process = subprocess.Popen(
+        [
+            FFMPEG_BINARY,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            *input_args,
+            *output_args,
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "pipe:1",
+        ],
+        stdin=subprocess.DEVNULL if isinstance(source, str) else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feeder = None
+    if not isinstance(source, str):
+        feeder = threading.Thread(
+            target=_feed, args=(process.stdin, source), daemon=True
+        )
+        feeder.start()
+
+    samples = np.empty(0, dtype=np.float32)
+    start = 0
+    try:
+        while True:
+            data = process.stdout.read((window - len(samples)) * 2)
+            if len(data) % 2:
+                data = data[:-1]
+            if data:
+                decoded = np.frombuffer(data, dtype="<i2").astype(np.float32)
+                samples = np.concatenate((samples, decoded / 32768.0))
+            if len(samples) < window:
+                # End of stream: emit the tail unless the previous window
+                # already covered it
+                if len(samples) > (window - hop if start else 0):
+                    yield start_seconds + start / SAMPLE_RATE, samples
+                break
+            yield start_seconds + start / SAMPLE_RATE, samples
+            samples = samples[hop:]
+            start += hop
+
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise DecodeError(stderr.decode("utf-8", "replace").strip())
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+        if feeder is not None:
+            feeder.join()
@@ -0,0 +1,76 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .decoder import SAMPLE_RATE
+
+N_FFT = 1024
+HOP_LENGTH = 256
+FRAMES_PER_SECOND = SAMPLE_RATE / HOP_LENGTH
+
+# A peak must be the maximum of its (time, frequency) neighbourhood
+PEAK_NEIGHBOURHOOD_FRAMES = 10
+PEAK_NEIGHBOURHOOD_BINS = 10
+PEAKS_PER_SECOND = 30
+
+# Each anchor peak is paired with the next FAN_OUT peaks at most
+# MAX_DELTA_FRAMES later; a hash packs (anchor bin, target bin, delta)
+FAN_OUT = 10
+FREQ_BITS = 9
+DELTA_BITS = 6
+MAX_DELTA_FRAMES = 2**DELTA_BITS - 1
+
+_window = np.hanning(N_FFT).astype(np.float32)
+
+
+def spectrogram(samples: np.ndarray) -> np.ndarray:
+    # (frames, bins) log magnitude, one vectorized FFT over all frames
+    if len(samples) < N_FFT:
+        return np.empty((0, N_FFT // 2 + 1), dtype=np.float32)
+    frames = sliding_window_view(samples, N_FFT)[::HOP_LENGTH]
+    spectrum = np.abs(np.fft.rfft(frames * _window, axis=1))
+    return np.log1p(spectrum).astype(np.float32)
+
+
+def _max_filter(values: np.ndarray, size: int, axis: int) -> np.ndarray:
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (size // 2, size // 2)
+    padded = np.pad(values, pad, constant_values=-np.inf)
+    return sliding_window_view(padded, size, axis=axis).max(axis=-1)
+
+
+def find_peaks(spec: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Separable 2-D maximum filter, then keep the strongest peaks only
+    if not spec.size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    local_max = _max_filter(spec, 2 * PEAK_NEIGHBOURHOOD_FRAMES + 1, axis=0)
+    local_max = _max_filter(local_max, 2 * PEAK_NEIGHBOURHOOD_BINS + 1, axis=1)
+    frames, bins = np.nonzero((spec == local_max) & (spec > spec.mean()))
+
+    budget = int(PEAKS_PER_SECOND * len(spec) / FRAMES_PER_SECOND) + 1
+    if len(frames) > budget:
+        strongest = np.argpartition(spec[frames, bins], -budget)[-budget:]
+        frames, bins = frames[strongest], bins[strongest]
+    order = np.lexsort((bins, frames))
+    return frames[order], bins[order]
+
+
+def hash_peaks(frames: np.ndarray, bins: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Returns (uint32 hashes, int32 anchor frames)
+    bins = np.minimum(bins, 2**FREQ_BITS - 1).astype(np.uint32)
+    hashes, anchors = [], []
+    for k in range(1, min(FAN_OUT, len(frames) - 1) + 1):
+        delta = frames[k:] - frames[:-k]
+        valid = (delta > 0) & (delta <= MAX_DELTA_FRAMES)
+        hashes.append(
+            (bins[:-k][valid] << (FREQ_BITS + DELTA_BITS))
+            | (bins[k:][valid] << DELTA_BITS)
+            | delta[valid].astype(np.uint32)
+        )
+        anchors.append(frames[:-k][valid])
+    if not hashes:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int32)
+    return np.concatenate(hashes), np.concatenate(anchors).astype(np.int32)
+
+
+def fingerprint(samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return hash_peaks(*find_peaks(spectrogram(samples)))
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_INDEX_PATH = os.getenv("FINGERPRINT_INDEX_PATH", "/app/data/fingerprints")
+# Hashes this common identify nothing and only add candidate pairs
+FINGERPRINT_MAX_HASH_OCCURRENCES = int(
+    os.getenv("FINGERPRINT_MAX_HASH_OCCURRENCES", "500")
+)
+
+INDEX_FORMAT_VERSION = 1
+# Points at the directory holding the live index version
+CURRENT_FILE = "CURRENT"
+
+# Batched match keys pack (query, track, offset delta) into one uint64
+_QUERY_BITS = 16
+_TRACK_BITS = 20
+_DELTA_BITS = 64 - _QUERY_BITS - _TRACK_BITS
+_DELTA_BIAS = 1 << (_DELTA_BITS - 1)
+
+
+@dataclass(frozen=True)
+class Match:
+    track_id: int
+    # Position of the query's frame 0 inside the reference track
+    offset_frames: int
+    # Number of hashes agreeing on that alignment
+    score: int
+
+
+class FingerprintIndex:
+    # Inverted index in CSR layout:
+    #   keys     uint32[n_keys]       distinct hashes, sorted
+    #   bounds   int64[n_keys + 1]    postings of keys[i] are bounds[i]:bounds[i+1]
+    #   tracks   int32[n_postings]    ReferenceTrack ids
+    #   offsets  int32[n_postings]    frame of the hash inside the track
+    # Each array is a plain .npy file opened with mmap_mode="r", so every worker
+    # process maps the same page-cache pages instead of holding its own copy.
+    def __init__(
+        self,
+        keys: np.ndarray,
+        bounds: np.ndarray,
+        tracks: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.keys = keys
+        self.bounds = bounds
+        self.tracks = tracks
+        self.offsets = offsets
+
+    @classmethod
+    def empty(cls) -> "FingerprintIndex":
+        return cls(
+            np.empty(0, np.uint32),
+            np.zeros(1, np.int64),
+            np.empty(0, np.int32),
+            np.empty(0, np.int32),
+        )
+
+    @classmethod
+    def build(
+        cls, hashes: np.ndarray, tracks: np.ndarray, offsets: np.ndarray
+    ) -> "FingerprintIndex":
+        if len(tracks) and int(tracks.max()) >= 1 << _TRACK_BITS:
+            raise ValueError("Too many reference tracks for the index format")
+        order = np.argsort(hashes, kind="stable")
+        keys, counts = np.unique(hashes[order], return_counts=True)
+        bounds = np.zeros(len(keys) + 1, np.int64)
+        np.cumsum(counts, out=bounds[1:])
+        return cls(
+            keys.astype(np.uint32),
+            bounds,
+            tracks[order].astype(np.int32),
+            offsets[order].astype(np.int32),
+        )
+
+    @classmethod
+    def open(cls, root: str, version: str | None = None) -> "FingerprintIndex":
+        version = version or current_version(root)
+        if version is None:
+            logger.warning("No fingerprint index in %s, nothing will match", root)
+            return cls.empty()
+        version_path = Path(root) / version
+        manifest = json.loads((version_path / "manifest.json").read_text())
+        if manifest["format"] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported fingerprint index format {manifest}")
+        return cls(
+            *(
+                np.load(version_path / f"{name}.npy", mmap_mode="r")
+                for name in ("keys", "bounds", "tracks", "offsets")
+            )
+        )
+
+    def save(self, root: str, version: str) -> None:
+        # Write a new version directory, then atomically repoint CURRENT;
+        # workers that already mapped the old version keep using it
+        version_path = Path(root) / version
+        version_path.mkdir(parents=True)
+        for name in ("keys", "bounds", "tracks", "offsets"):
+            np.save(version_path / f"{name}.npy", getattr(self, name))
+        (version_path / "manifest.json").write_text(
+            json.dumps(
+                {
+                    "format": INDEX_FORMAT_VERSION,
+                    "keys": len(self.keys),
+                    "postings": len(self.tracks),
+                }
+            )
+        )
+        tmp = Path(root) / f"{CURRENT_FILE}.tmp"
+        tmp.write_text(version)
+        os.replace(tmp, Path(root) / CURRENT_FILE)
+
+    def postings(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Flat (hash, track, offset) arrays, used to merge in new tracks
+        hashes = np.repeat(self.keys, np.diff(self.bounds))
+        return hashes, np.asarray(self.tracks), np.asarray(self.offsets)
+
+    def best_matches(
+        self,
+        queries: list[tuple[np.ndarray, np.ndarray]],
+        top_k: int = 1,
+        min_score: int = 1,
+    ) -> list[list[Match]]:
+        # Scores every query (hashes, anchor offsets) in one vectorized pass and
+        # returns up to top_k matches per query, best first, one per track
+        results: list[list[Match]] = [[] for _ in queries]
+        if not queries or not len(self.keys):
+            return results
+
+        hashes = np.concatenate([query_hashes for query_hashes, _ in queries])
+        query_offsets = np.concatenate([offsets for _, offsets in queries])
+        query_ids = np.repeat(
+            np.arange(len(queries), dtype=np.uint64),
+            [len(query_hashes) for query_hashes, _ in queries],
+        )
+
+        positions = np.searchsorted(self.keys, hashes)
+        positions = np.minimum(positions, len(self.keys) - 1)
+        found = self.keys[positions] == hashes
+        left = self.bounds[positions]
+        counts = np.where(found, self.bounds[positions + 1] - left, 0)
+        counts[counts > FINGERPRINT_MAX_HASH_OCCURRENCES] = 0
+        total = int(counts.sum())
+        if not total:
+            return results
+
+        # Expand every query hash into its postings without a Python loop
+        hash_index = np.repeat(np.arange(len(hashes)), counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        posting = np.repeat(left, counts) + np.arange(total) - run_starts
+
+        # Matching audio agrees on (track, reference offset - query offset)
+        tracks = self.tracks[posting].astype(np.uint64)
+        deltas = (
+            self.offsets[posting].astype(np.int64)
+            - query_offsets[hash_index]
+            + _DELTA_BIAS
+        ).astype(np.uint64)
+        keys, votes = np.unique(
+            (query_ids[hash_index] << np.uint64(_TRACK_BITS + _DELTA_BITS))
+            | (tracks << np.uint64(_DELTA_BITS))
+            | deltas,
+            return_counts=True,
+        )
+        strong = votes >= min_score
+        keys, votes = keys[strong], votes[strong]
+        key_queries = (keys >> np.uint64(_TRACK_BITS + _DELTA_BITS)).astype(np.int64)
+        key_tracks = (keys >> np.uint64(_DELTA_BITS)) & np.uint64(
+            (1 << _TRACK_BITS) - 1
+        )
+        key_deltas = (keys & np.uint64((1 << _DELTA_BITS) - 1)).astype(
+            np.int64
+        ) - _DELTA_BIAS
+
+        # Best alignment per (query, track), then the top_k tracks per query
+        order = np.lexsort((-votes, key_tracks, key_queries))
+        group = (key_queries[order] << _TRACK_BITS) | key_tracks[order].astype(np.int64)
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = group[1:] != group[:-1]
+        best = order[first]
+        best = best[np.lexsort((-votes[best], key_queries[best]))]
+        for i in best:
+            query_results = results[key_queries[i]]
+            if len(query_results) < top_k:
+                query_results.append(
+                    Match(
+                        track_id=int(key_tracks[i]),
+                        offset_frames=int(key_deltas[i]),
+                        score=int(votes[i]),
+                    )
+                )
+        return results
+
+
+def current_version(root: str) -> str | None:
+    try:
+        return (Path(root) / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def prune_versions(root: str, keep: set[str]) -> None:
+    # Workers that still map a removed version keep reading it until they
+    # remap, since the files are only unlinked
+    for path in Path(root).iterdir():
+        if path.is_dir() and path.name not in keep:
+            shutil.rmtree(path)
+            logger.info("Removed fingerprint index version %s", path.name)
+
+
+_index: FingerprintIndex | None = None
+_index_version: str | None = None
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    # Mapped once per worker process, and remapped after an ingest publishes
+    # a new version
+    global _index, _index_version
+    version = current_version(FINGERPRINT_INDEX_PATH)
+    if _index is None or version != _index_version:
+        _index = FingerprintIndex.open(FINGERPRINT_INDEX_PATH, version)
+        _index_version = version
+    return _index
@@ -0,0 +1,191 @@
+# Bulk-ingest reference tracks into the fingerprint index:
+#   python -m src.fingerprints.ingest manifest.json [--workers 4]
+# manifest.json lists {"path", "artist", "title"} entries, with paths relative
+# to the manifest. Files already ingested (same sha256) are skipped.
+import argparse
+import hashlib
+import json
+import logging
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, select
+
+from ..database.database import SessionLocal
+from ..logging import LogLevels, configure_logging
+from .decoder import SAMPLE_RATE, decode_windows
+from .fingerprint import HOP_LENGTH, fingerprint
+from .index import (
+    FINGERPRINT_INDEX_PATH,
+    FingerprintIndex,
+    current_version,
+    prune_versions,
+)
+from .models import ReferenceTrack
+
+logger = logging.getLogger(__name__)
+
+# Reference tracks are fingerprinted in back-to-back windows of this length
+REFERENCE_WINDOW_SECONDS = 30.0
+READ_CHUNK_SIZE = 1024 * 1024
+# Postgres advisory lock serializing ingests: each one rebuilds the index
+# from the last saved version, so concurrent runs would drop each other's
+# tracks
+INGEST_LOCK_ID = 0x66707269_6E677374
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: Path) -> tuple[np.ndarray, np.ndarray, float]:
+    # Returns (hashes, anchor frames from the start of the track, duration)
+    hashes, offsets = [], []
+    duration = 0.0
+    for start, samples in decode_windows(
+        str(path), REFERENCE_WINDOW_SECONDS, REFERENCE_WINDOW_SECONDS
+    ):
+        window_hashes, window_offsets = fingerprint(samples)
+        hashes.append(window_hashes)
+        offsets.append(window_offsets + round(start * SAMPLE_RATE / HOP_LENGTH))
+        duration = start + len(samples) / SAMPLE_RATE
+    if not hashes:
+        return np.empty(0, np.uint32), np.empty(0, np.int32), duration
+    return np.concatenate(hashes), np.concatenate(offsets).astype(np.int32), duration
+
+
+def _fingerprint_entry(item: tuple[int, str]):
+    position, path = item
+    return position, *fingerprint_file(Path(path))
+
+
+def _pending(db, entries: list[dict]) -> list[dict]:
+    # Drops files already ingested, and duplicates within the manifest
+    known = set(
+        db.execute(
+            select(ReferenceTrack.sha256).where(
+                ReferenceTrack.sha256.in_([entry["sha256"] for entry in entries])
+            )
+        ).scalars()
+    )
+    pending = {}
+    for entry in entries:
+        if entry["sha256"] not in known:
+            pending.setdefault(entry["sha256"], entry)
+    return list(pending.values())
+
+
+def ingest(manifest_path: str, index_path: str, workers: int) -> int:
+    manifest = Path(manifest_path)
+    entries = json.loads(manifest.read_text())
+    for entry in entries:
+        entry["path"] = str(manifest.parent / entry["path"])
+        entry["sha256"] = _sha256(Path(entry["path"]))
+
+    db = SessionLocal()
+    try:
+        entries = _pending(db, entries)
+        # No transaction stays open while fingerprinting
+        db.commit()
+        if not entries:
+            logger.info("Nothing to ingest")
+            return 0
+
+        start = time.perf_counter()
+        with Pool(workers) as pool:
+            fingerprints = sorted(
+                pool.imap_unordered(
+                    _fingerprint_entry,
+                    [
+                        (position, entry["path"])
+                        for position, entry in enumerate(entries)
+                    ],
+                )
+            )
+        logger.info(
+            "Fingerprinted %d tracks in %.1fs",
+            len(entries),
+            time.perf_counter() - start,
+        )
+
+        # Held until commit or rollback: open, merge and save below see the
+        # index as the previous ingest left it
+        db.execute(select(func.pg_advisory_xact_lock(INGEST_LOCK_ID)))
+        # A run that held the lock may have ingested some of the same files
+        pending = {entry["sha256"] for entry in _pending(db, entries)}
+        tracks = [
+            ReferenceTrack(
+                artist=entry["artist"],
+                title=entry["title"],
+                duration=duration,
+                sha256=entry["sha256"],
+            )
+            for entry, (_, _, _, duration) in zip(entries, fingerprints)
+            if entry["sha256"] in pending
+        ]
+        fingerprints = [
+            fingerprint
+            for entry, fingerprint in zip(entries, fingerprints)
+            if entry["sha256"] in pending
+        ]
+        if not tracks:
+            logger.info("Nothing to ingest")
+            return 0
+        db.add_all(tracks)
+        db.flush()
+
+        index = FingerprintIndex.open(index_path)
+        hashes, track_ids, offsets = index.postings()
+        new_hashes = [hashes]
+        new_track_ids = [track_ids]
+        new_offsets = [offsets]
+        for track, (_, track_hashes, track_offsets, _) in zip(tracks, fingerprints):
+            new_hashes.append(track_hashes)
+            new_track_ids.append(np.full(len(track_hashes), track.id, np.int32))
+            new_offsets.append(track_offsets)
+        index = FingerprintIndex.build(
+            np.concatenate(new_hashes),
+            np.concatenate(new_track_ids),
+            np.concatenate(new_offsets),
+        )
+        # The index only references rows once it is saved, so commit last
+        previous = current_version(index_path)
+        version = str(time.time_ns())
+        index.save(index_path, version)
+        db.commit()
+        # The previous version stays around to roll back to
+        prune_versions(index_path, {version, previous})
+        logger.info(
+            "Ingested %d tracks, index has %d hashes and %d postings",
+            len(tracks),
+            len(index.keys),
+            len(index.tracks),
+        )
+        return len(tracks)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk-ingest reference tracks into the fingerprint index"
+    )
+    parser.add_argument("manifest")
+    parser.add_argument("--index-path", default=FINGERPRINT_INDEX_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    configure_logging(LogLevels.info)
+    ingest(args.manifest, args.index_path, args.workers)
+
+
+if __name__ == "__main__":
+    main()
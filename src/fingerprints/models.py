@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from ..database.database import Base
+
+
+class ReferenceTrack(Base):
+    __tablename__ = "reference_tracks"
+
+    # Integer ids, not UUIDs: they are stored in every fingerprint index posting
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    artist = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    duration = Column(Float, nullable=False)
+    # Content hash of the source file, so re-ingesting it is a no-op
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"ReferenceTrack(id={self.id}, artist={self.artist!r}, title={self.title!r})"
@@ -0,0 +1,135 @@
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+from .decoder import SAMPLE_RATE, decode_windows
+from .fingerprint import FRAMES_PER_SECOND, fingerprint
+from .index import FingerprintIndex
+
+FINGERPRINT_WINDOW_SECONDS = float(os.getenv("FINGERPRINT_WINDOW_SECONDS", "10"))
+FINGERPRINT_HOP_SECONDS = float(os.getenv("FINGERPRINT_HOP_SECONDS", "5"))
+# Windows matched against the index together in one vectorized pass
+FINGERPRINT_BATCH_WINDOWS = int(os.getenv("FINGERPRINT_BATCH_WINDOWS", "16"))
+# Minimum number of aligned hashes for a window to count as a match
+FINGERPRINT_MIN_SCORE = int(os.getenv("FINGERPRINT_MIN_SCORE", "10"))
+# Consecutive windows belong to the same play if they place the track's start
+# within this many seconds of each other
+FINGERPRINT_ALIGNMENT_TOLERANCE_SECONDS = 1.0
+
+
+@dataclass
+class IdentifiedPlay:
+    track_id: int
+    # Where the reference track's start falls in the uploaded audio
+    track_start: float
+    start_offset: float
+    end_offset: float
+    scores: list[float]
+
+    @property
+    def duration(self) -> float:
+        return self.end_offset - self.start_offset
+
+    @property
+    def confidence(self) -> float:
+        return sum(self.scores) / len(self.scores)
+
+
+@dataclass
+class _Window:
+    start: float
+    end: float
+    hashes: np.ndarray
+    offsets: np.ndarray
+
+
+def _batches(windows: Iterable[tuple[float, np.ndarray]]) -> Iterator[list[_Window]]:
+    batch = []
+    for start, samples in windows:
+        hashes, offsets = fingerprint(samples)
+        batch.append(
+            _Window(start, start + len(samples) / SAMPLE_RATE, hashes, offsets)
+        )
+        if len(batch) == FINGERPRINT_BATCH_WINDOWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _add_play(plays: list[IdentifiedPlay], play: IdentifiedPlay) -> None:
+    # plays is ordered by start_offset; play starts at or after the last one
+    current = plays[-1] if plays else None
+    if (
+        current is not None
+        and current.track_id == play.track_id
+        and abs(current.track_start - play.track_start)
+        <= FINGERPRINT_ALIGNMENT_TOLERANCE_SECONDS
+    ):
+        current.end_offset = max(current.end_offset, play.end_offset)
+        current.scores.extend(play.scores)
+        return
+    if current is not None:
+        # Windows overlap, so the previous play ends where this one starts
+        current.end_offset = min(current.end_offset, play.start_offset)
+    plays.append(play)
+
+
+def merge_plays(plays: list[IdentifiedPlay]) -> list[IdentifiedPlay]:
+    # Joins plays found by separate, overlapping segments of one upload
+    merged: list[IdentifiedPlay] = []
+    for play in sorted(plays, key=lambda play: play.start_offset):
+        _add_play(merged, play)
+    return merged
+
+
+def identify(
+    source: str | Iterable[bytes],
+    index: FingerprintIndex,
+    start_seconds: float = 0.0,
+    duration_seconds: float | None = None,
+) -> tuple[list[IdentifiedPlay], float]:
+    # Returns the identified plays and the offset where decoding stopped
+    windows = decode_windows(
+        source,
+        FINGERPRINT_WINDOW_SECONDS,
+        FINGERPRINT_HOP_SECONDS,
+        start_seconds,
+        duration_seconds,
+    )
+    return identify_windows(windows, index, start_seconds)
+
+
+def identify_windows(
+    windows: Iterable[tuple[float, np.ndarray]],
+    index: FingerprintIndex,
+    start_seconds: float = 0.0,
+) -> tuple[list[IdentifiedPlay], float]:
+    # identify() on already decoded (start_seconds, samples) windows
+    plays: list[IdentifiedPlay] = []
+    audio_seconds = start_seconds
+    for batch in _batches(windows):
+        matches = index.best_matches(
+            [(window.hashes, window.offsets) for window in batch],
+            min_score=FINGERPRINT_MIN_SCORE,
+        )
+        for window, window_matches in zip(batch, matches):
+            audio_seconds = window.end
+            if not window_matches:
+                continue
+            match = window_matches[0]
+            track_start = window.start - match.offset_frames / FRAMES_PER_SECOND
+            _add_play(
+                plays,
+                IdentifiedPlay(
+                    track_id=match.track_id,
+                    track_start=track_start,
+                    start_offset=max(window.start, track_start),
+                    end_offset=window.end,
+                    # Fraction of the window's hashes that agree with the match
+                    scores=[match.score / len(window.hashes)],
+                ),
+            )
+    return plays, audio_seconds
@@ -1,7 +1,39 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from enum import StrEnum
+from uuid import uuid4
+
+LOG_FORMAT_DEBUG = (
+    "%(levelname)s - %(message)s - %(pathname)s - %(funcName)s - %(lineno)d"
+)
+
+# "json" for structured logs, "text" for reading them in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Per-module levels on top of the global one, e.g.
+# "src.auth=DEBUG;sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Below ERROR, at most this many records with the same logger, level and
+# message template per window; the rest are counted, not written
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+LOG_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("LOG_RATE_LIMIT_WINDOW_SECONDS", "60"))
+# Runtime overrides of LOG_LEVELS are read from this Redis key, see set_levels
+LOG_LEVELS_KEY = "logging:levels"
+LOG_LEVELS_REFRESH_SECONDS = float(os.getenv("LOG_LEVELS_REFRESH_SECONDS", "10"))
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
 
-LOG_FORMAT_DEBUG = "%(levelname)s - %(message)s - %(pathname)s - %(funcName)s - %(lineno)d"
 
 class LogLevels(StrEnum):
     debug = "DEBUG"
@@ -10,14 +42,287 @@ class LogLevels(StrEnum):
     error = "ERROR"
     critical = "CRITICAL"
 
+
+@dataclass
+class _LogContext:
+    request_id: str | None = None
+    user_id: str | None = None
+
+
+# Mutable, so values bound in threadpool dependencies (get_current_user)
+# are seen by the rest of the request
+_log_context: ContextVar[_LogContext | None] = ContextVar("log_context", default=None)
+
+
+def bind_user_id(user_id: object) -> None:
+    context = _log_context.get()
+    if context is not None:
+        context.user_id = str(user_id)
+
+
+def bind_task_context(task_id: str | None = None, **kwargs) -> None:
+    # Celery task_prerun handler: worker logs carry the task id as request id
+    _log_context.set(_LogContext(request_id=task_id))
+
+
+def clear_task_context(**kwargs) -> None:
+    _log_context.set(None)
+
+
+class RequestContextMiddleware:
+    # Reuses the caller's X-Request-ID when it looks sane, otherwise makes one,
+    # and echoes it on the response
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid4().hex
+        token = _log_context.set(_LogContext(request_id=request_id))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    # Runs in the thread that logs, before the record is queued
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.request_id = context.request_id if context else None
+        record.user_id = context.user_id if context else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    max_keys = 10000
+
+    def __init__(self, burst: int, window_seconds: float):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        # (logger, level, template) -> [window start, written, suppressed]
+        self._windows: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                if window is not None and window[2]:
+                    # Reported on the first record of the next window
+                    record.suppressed = window[2]
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._evict(now)
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def _evict(self, now: float) -> None:
+        expired = [
+            key
+            for key, window in self._windows.items()
+            if now - window[0] >= self.window_seconds
+        ]
+        for key in expired or list(self._windows):
+            del self._windows[key]
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Renders the message and traceback in the caller's thread (args may
+        # be mutable objects) but leaves the formatting to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# LogRecord attributes that are not user-supplied extras
+_RESERVED_ATTRS = set(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "request_id",
+    "user_id",
+    "suppressed",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in ("request_id", "user_id", "suppressed"):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        for name, value in record.__dict__.items():
+            if name not in _RESERVED_ATTRS and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        # Flushes what is still queued
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def _parse_levels(raw: str) -> dict[str, str]:
+    levels = {}
+    for item in raw.replace(",", ";").split(";"):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_applied_levels: dict[str, str] = {}
+
+
+def apply_levels(levels: dict[str, str]) -> None:
+    # Loggers dropped from the overrides go back to inheriting the root level
+    for name in set(_applied_levels) - set(levels):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        if level not in LogLevels.__members__.values():
+            logging.getLogger(__name__).warning("Ignoring log level %s=%s", name, level)
+            continue
+        logging.getLogger(name).setLevel(level)
+    _applied_levels.clear()
+    _applied_levels.update(levels)
+
+
 def configure_logging(log_level: str = LogLevels.error):
+    global _listener
     log_level = str(log_level).upper()
     log_levels = [level.value for level in LogLevels]
 
     if log_level not in log_levels:
         raise ValueError(f"Invalid log level: {log_level}")
 
-    if log_level == LogLevels.debug:
-        logging.basicConfig(level=log_level, format=LOG_FORMAT_DEBUG)
+    if LOG_FORMAT == "text":
+        formatter = logging.Formatter(
+            LOG_FORMAT_DEBUG
+            if log_level == LogLevels.debug
+            else "%(levelname)s:%(name)s:%(request_id)s:%(message)s"
+        )
+    else:
+        formatter = JsonFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # Emitting only enqueues; a listener thread does the (blocking) writes
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(
+        RateLimitFilter(LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_WINDOW_SECONDS)
+    )
+
+    _stop_listener()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(log_level)
+    # Server logs go through the same pipeline
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    apply_levels(_parse_levels(LOG_LEVELS))
+
+
+def _refresh_levels() -> None:
+    from .core.redis import get_sync_redis
+
+    raw = get_sync_redis().get(LOG_LEVELS_KEY)
+    apply_levels({**_parse_levels(LOG_LEVELS), **json.loads(raw or "{}")})
+
+
+_level_watcher: threading.Thread | None = None
+
+
+def start_level_watcher() -> None:
+    # Polls the runtime overrides so every process (each uvicorn and Celery
+    # worker) picks them up, without a restart
+    global _level_watcher
+    if _level_watcher is not None:
+        return
+
+    def watch():
+        while True:
+            try:
+                _refresh_levels()
+            except Exception:
+                logging.getLogger(__name__).warning(
+                    "Could not refresh log levels", exc_info=True
+                )
+            time.sleep(LOG_LEVELS_REFRESH_SECONDS)
+
+    _level_watcher = threading.Thread(target=watch, name="log-levels", daemon=True)
+    _level_watcher.start()
+
+
+def set_levels(levels: dict[str, str]) -> None:
+    # Replaces the runtime overrides, e.g. {"src.auth": "DEBUG"}; an empty
+    # dict goes back to LOG_LEVELS
+    from .core.redis import get_sync_redis
+
+    get_sync_redis().set(LOG_LEVELS_KEY, json.dumps(levels))
+
 
-    logging.basicConfig(level=log_level)
+if __name__ == "__main__":
+    # python -m src.logging src.auth=DEBUG sqlalchemy.engine=INFO
+    # python -m src.logging  (clears the overrides)
+    set_levels(_parse_levels(";".join(sys.argv[1:])))
@@ -1,23 +1,49 @@
+import time
+
+_import_started_at = time.perf_counter()
+
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .database.database import Base, engine
+from .database.database import async_engine
 from fastapi.middleware.cors import CORSMiddleware
 from .core.router import register_routes
-from .logging import configure_logging, LogLevels
-import logging
+from .logging import (
+    configure_logging,
+    LogLevels,
+    RequestContextMiddleware,
+    start_level_watcher,
+)
 from .exceptions import register_exception_handlers
+from .core.cache import start_invalidation_listener, stop_invalidation_listener
+from .core.redis import get_redis
+from .core.admission import AdmissionControlMiddleware
+from .core.instrumentation import RequestMetricsMiddleware
+from .core.metrics import mark_process_dead
+from .core.startup import record_import_time, warm_up
+from .rate_limiting import RateLimitHeadersMiddleware
 
-from .users.models import User  # noqa: F401
-from .auth.models import RefreshToken  # noqa: F401
-from .audios.models import Audio, TrackPlay  # noqa: F401
-from .events.models import Event  # noqa: F401
+from .database import models  # noqa: F401
 
 configure_logging(LogLevels.info)
 
-# # Create all tables
-Base.metadata.create_all(bind=engine)
-logging.info("Tables created")
+# The schema is managed by migrations (alembic upgrade head), run once per
+# deploy rather than by every process on import
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_level_watcher()
+    start_invalidation_listener(get_redis())
+    await warm_up()
+    yield
+    await stop_invalidation_listener()
+    await async_engine.dispose()
+    mark_process_dead(os.getpid())
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -31,5 +57,18 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Sheds load before any route runs; shed requests are still measured and
+# carry a request id
+app.add_middleware(AdmissionControlMiddleware)
+
+# Outermost: the request id is bound before anything else runs, and latency
+# includes every other middleware
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
 register_exception_handlers(app)
 register_routes(app)
+
+record_import_time(_import_started_at)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import JSON, UUID, Column, DateTime, Index, Integer, String
+
+from ..database.database import Base
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    # Also the Celery task id, so a message published twice is one task id
+    id = Column(UUID, primary_key=True, default=uuid4)
+    task = Column(String, nullable=False)
+    args = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    # Failed publishes are retried from here on
+    available_at = Column(DateTime, default=datetime.now, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (Index("ix_outbox_messages_available_at", "available_at"),)
+
+    def __repr__(self):
+        return (
+            f"OutboxMessage(id={self.id}, task={self.task!r}, attempts={self.attempts})"
+        )
+
+
+class OutboxEvent(Base):
+    # Domain events for the Kafka stream, written in the transaction making
+    # the change they describe
+    __tablename__ = "outbox_events"
+
+    # Sent as the event id: consumers drop duplicates on it
+    id = Column(UUID, primary_key=True, default=uuid4)
+    topic = Column(String, nullable=False)
+    # Partition key: the audio or event the change is about
+    key = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    available_at = Column(DateTime, default=datetime.now, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_available_at_created_at", "available_at", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"OutboxEvent(id={self.id}, type={self.type!r}, key={self.key!r})"
@@ -0,0 +1,27 @@
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import OutboxEvent, OutboxMessage
+
+
+def enqueue(db: AsyncSession | Session, task: str, *args) -> OutboxMessage:
+    # Only adds the message: it is committed, and later published, with the
+    # caller's transaction
+    message = OutboxMessage(task=task, args=list(args))
+    db.add(message)
+    return message
+
+
+def record_event(
+    db: AsyncSession | Session, topic: str, event_type: str, key: UUID, data: dict
+) -> OutboxEvent:
+    # Same as enqueue, for the Kafka stream, e.g. "audio.created" keyed by the
+    # audio id
+    event = OutboxEvent(
+        topic=topic, key=str(key), type=event_type, payload=jsonable_encoder(data)
+    )
+    db.add(event)
+    return event
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from redis.exceptions import LockError
+from sqlalchemy import delete, select, update
+
+from src.core.celery import celery_app
+from src.core.kafka import EventRecord, get_event_broker
+from src.core.redis import get_sync_redis
+from src.database.database import SessionLocal
+from src.outbox.models import OutboxEvent, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DISPATCH_BATCH_SIZE = int(os.getenv("OUTBOX_DISPATCH_BATCH_SIZE", "100"))
+OUTBOX_DISPATCH_MAX_BATCHES = int(os.getenv("OUTBOX_DISPATCH_MAX_BATCHES", "20"))
+OUTBOX_RETRY_MAX_SECONDS = 300
+OUTBOX_EVENTS_BATCH_SIZE = int(os.getenv("OUTBOX_EVENTS_BATCH_SIZE", "500"))
+OUTBOX_EVENTS_MAX_BATCHES = int(os.getenv("OUTBOX_EVENTS_MAX_BATCHES", "10"))
+OUTBOX_EVENTS_LOCK_KEY = "outbox:events:publisher"
+OUTBOX_EVENTS_LOCK_SECONDS = 600
+
+
+@celery_app.task(ignore_result=True)
+def dispatch_outbox():
+    # Publishes committed messages, then deletes them. A crash in between
+    # publishes a message again: consumers must be idempotent (at least once).
+    dispatched = failed = 0
+    db = SessionLocal()
+    try:
+        for _ in range(OUTBOX_DISPATCH_MAX_BATCHES):
+            now = datetime.now()
+            messages = (
+                db.execute(
+                    select(OutboxMessage)
+                    .where(OutboxMessage.available_at <= now)
+                    .order_by(OutboxMessage.available_at)
+                    .limit(OUTBOX_DISPATCH_BATCH_SIZE)
+                    # Concurrent dispatchers take disjoint batches
+                    .with_for_update(skip_locked=True)
+                )
+                .scalars()
+                .all()
+            )
+            if not messages:
+                break
+
+            published = []
+            for message in messages:
+                try:
+                    celery_app.send_task(
+                        message.task, args=message.args, task_id=str(message.id)
+                    )
+                    published.append(message.id)
+                except Exception as e:
+                    logger.warning(
+                        "Could not send outbox message %s", message.id, exc_info=True
+                    )
+                    failed += 1
+                    delay = min(2**message.attempts, OUTBOX_RETRY_MAX_SECONDS)
+                    db.execute(
+                        update(OutboxMessage)
+                        .where(OutboxMessage.id == message.id)
+                        .values(
+                            attempts=OutboxMessage.attempts + 1,
+                            available_at=now + timedelta(seconds=delay),
+                            last_error=str(e)[:500],
+                        )
+                    )
+            if published:
+                db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(published)))
+            db.commit()
+            dispatched += len(published)
+            if len(messages) < OUTBOX_DISPATCH_BATCH_SIZE:
+                break
+    finally:
+        db.close()
+
+    if dispatched or failed:
+        logger.info("Dispatched %d outbox messages, %d failed", dispatched, failed)
+    return {"dispatched": dispatched, "failed": failed}
+
+
+def kick_dispatcher() -> None:
+    # Publishes right away instead of at the next beat. Best effort: if the
+    # broker is down the beat schedule picks the messages up later.
+    try:
+        # A single connection attempt and no result subscription: with the
+        # broker down this must fail fast, not hold up the request
+        with celery_app.connection_for_write(
+            transport_options={"max_retries": 0}
+        ) as connection:
+            dispatch_outbox.apply_async(
+                retry=False, ignore_result=True, connection=connection
+            )
+    except Exception:
+        logger.warning("Could not kick the outbox dispatcher", exc_info=True)
+
+
+def _to_record(event: OutboxEvent) -> EventRecord:
+    envelope = {
+        "id": str(event.id),
+        "type": event.type,
+        "occurred_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+    return EventRecord(
+        topic=event.topic,
+        key=event.key,
+        value=json.dumps(envelope).encode(),
+        headers=(("event_id", str(event.id).encode()), ("type", event.type.encode())),
+    )
+
+
+@celery_app.task(ignore_result=True)
+def publish_outbox_events():
+    # Publishes committed domain events to Kafka in batches, then deletes
+    # them; at least once, like dispatch_outbox. A single publisher at a time
+    # keeps the events of each key in order.
+    lock = get_sync_redis().lock(
+        OUTBOX_EVENTS_LOCK_KEY, timeout=OUTBOX_EVENTS_LOCK_SECONDS
+    )
+    if not lock.acquire(blocking=False):
+        return {"published": 0, "failed": 0, "skipped": True}
+
+    published = failed = 0
+    db = SessionLocal()
+    try:
+        broker = get_event_broker()
+        for _ in range(OUTBOX_EVENTS_MAX_BATCHES):
+            now = datetime.now()
+            events = (
+                db.execute(
+                    select(OutboxEvent)
+                    .where(OutboxEvent.available_at <= now)
+                    .order_by(OutboxEvent.created_at, OutboxEvent.id)
+                    .limit(OUTBOX_EVENTS_BATCH_SIZE)
+                )
+                .scalars()
+                .all()
+            )
+            if not events:
+                break
+
+            results = broker.publish([_to_record(event) for event in events])
+            sent = []
+            failed_keys = set()
+            for event, error in zip(events, results):
+                if (event.topic, event.key) in failed_keys:
+                    # Sent after an earlier event of its key failed: kept, so
+                    # it is sent again after that one (consumers drop the
+                    # duplicate on the event id)
+                    continue
+                if error is None:
+                    sent.append(event.id)
+                    continue
+                failed_keys.add((event.topic, event.key))
+                failed += 1
+                delay = min(2**event.attempts, OUTBOX_RETRY_MAX_SECONDS)
+                db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id == event.id)
+                    .values(
+                        attempts=OutboxEvent.attempts + 1, last_error=str(error)[:500]
+                    )
+                )
+                # The later events of the same key wait with it, so they are
+                # not published ahead of it
+                db.execute(
+                    update(OutboxEvent)
+                    .where(
+                        OutboxEvent.topic == event.topic,
+                        OutboxEvent.key == event.key,
+                        OutboxEvent.created_at >= event.created_at,
+                    )
+                    .values(available_at=now + timedelta(seconds=delay))
+                )
+            if sent:
+                db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(sent)))
+            db.commit()
+            published += len(sent)
+            if len(events) < OUTBOX_EVENTS_BATCH_SIZE:
+                break
+    except Exception:
+        # Kafka unreachable: everything stays in the outbox for the next run
+        db.rollback()
+        logger.warning("Could not publish outbox events", exc_info=True)
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            # Held past OUTBOX_EVENTS_LOCK_SECONDS and expired (another
+            # publisher may have it now): nothing left to release
+            logger.warning("Outbox publisher lock expired before release")
+
+    if published or failed:
+        logger.info("Published %d outbox events, %d failed", published, failed)
+    return {"published": published, "failed": failed}
@@ -1,4 +1,174 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import logging
+import os
+from dataclasses import dataclass
 
-limiter = Limiter(key_func=get_remote_address)
+from fastapi import Depends, Request
+from jwt import PyJWTError
+from redis.exceptions import RedisError
+
+from .auth.service import get_access_token
+from .auth.tokens import get_token_verifier
+from .core.redis import RedisClient
+from .exceptions import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Where limited routes store their RateLimit-* headers for
+# RateLimitHeadersMiddleware
+RATE_LIMIT_HEADERS_STATE = "rate_limit_headers"
+
+# "<METHOD> <route path>" -> "<count>/<period> [by ip|user]"; RATE_LIMITS in the
+# environment overrides or adds entries, e.g.
+# "POST /auth/login=20/minute by ip;GET /audios/=5/second".
+# "by user" (the default) counts per authenticated user, and per IP for
+# anonymous requests.
+DEFAULT_RATE_LIMITS = {
+    "POST /auth/register": "5/hour by ip",
+    "POST /auth/login": "10/minute by ip",
+    "POST /auth/refresh": "30/minute by ip",
+    "POST /audios/": "30/hour by user",
+}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    count: int
+    period_seconds: int
+    key: str = "user"
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        rate, _, key = value.strip().partition(" by ")
+        count, _, period = rate.partition("/")
+        key = key.strip() or "user"
+        if key not in ("ip", "user"):
+            raise ValueError(f"Rate limits are by ip or by user, not {key}")
+        return cls(int(count), _PERIODS[period.strip().rstrip("s")], key)
+
+    @property
+    def policy(self) -> str:
+        return f"{self.count};w={self.period_seconds}"
+
+
+def _load_rate_limits() -> dict[str, RateLimit]:
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for item in os.getenv("RATE_LIMITS", "").split(";"):
+        route, sep, value = item.partition("=")
+        if sep:
+            limits[" ".join(route.split())] = value
+    return {route: RateLimit.parse(value) for route, value in limits.items()}
+
+
+RATE_LIMITS = _load_rate_limits()
+
+# GCRA: a single "theoretical arrival time" per key, stored in milliseconds.
+# Uses the Redis clock so every process agrees on the time.
+# Returns {allowed, remaining, retry_after_ms, reset_ms}
+_GCRA = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if allow_at > now then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, math.floor((period - (new_tat - now)) / interval), 0, new_tat - now}
+"""
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _subject(request: Request, limit: RateLimit, access_token: str | None) -> str:
+    if limit.key == "user" and access_token:
+        # Not an authentication check: a bad token is rejected by the route,
+        # and is only counted against its IP here
+        try:
+            user_id = get_token_verifier().verify(access_token).user_id
+        except PyJWTError:
+            user_id = None
+        if user_id:
+            # Users behind a shared NAT get their own bucket
+            return f"user:{user_id}"
+    return f"ip:{_client_ip(request)}"
+
+
+async def rate_limit(
+    redis: RedisClient,
+    request: Request,
+    access_token: str | None = Depends(get_access_token),
+) -> None:
+    route = request.scope["route"].path
+    limit = RATE_LIMITS.get(f"{request.method} {route}")
+    if limit is None:
+        return
+
+    subject = _subject(request, limit, access_token)
+    period_ms = limit.period_seconds * 1000
+    try:
+        allowed, remaining, retry_after_ms, reset_ms = await redis.eval(
+            _GCRA,
+            1,
+            f"{RATE_LIMIT_KEY_PREFIX}{request.method}:{route}:{subject}",
+            max(period_ms // limit.count, 1),
+            period_ms,
+        )
+    except RedisError as e:
+        # Fail open: an unavailable limiter must not take the API down with it
+        logger.warning("Rate limiter unavailable: %s", e)
+        return
+
+    headers = {
+        "RateLimit-Limit": str(limit.count),
+        "RateLimit-Remaining": str(remaining),
+        "RateLimit-Reset": str(-(-int(reset_ms) // 1000)),
+        "RateLimit-Policy": limit.policy,
+    }
+    if not allowed:
+        headers["Retry-After"] = str(max(-(-int(retry_after_ms) // 1000), 1))
+        raise RateLimitExceededError(headers)
+    setattr(request.state, RATE_LIMIT_HEADERS_STATE, headers)
+
+
+# Added to every API router: the RATE_LIMITS table decides what is limited
+RateLimited = Depends(rate_limit)
+
+
+class RateLimitHeadersMiddleware:
+    # Adds the headers at the ASGI level, so they also reach the Response
+    # objects that routes build themselves (cached JSON, downloads)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get(RATE_LIMIT_HEADERS_STATE)
+                if headers:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *(
+                            (name.lower().encode(), value.encode())
+                            for name, value in headers.items()
+                        ),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
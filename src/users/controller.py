@@ -8,11 +8,11 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=schemas.UserResponse)
 async def get_current_user(current_user: CurrentUser, db: DbSession):
-    return service.get_user_by_id(db, current_user.get_uuid())
+    return await service.get_user_by_id(db, current_user.get_uuid())
 
 
 @router.put("/change-password", status_code=status.HTTP_200_OK)
 async def change_password(
     password_change: schemas.PasswordChangeRequest, db: DbSession, current_user: CurrentUser
 ):
-    service.change_password(db, current_user.get_uuid(), password_change)
+    await service.change_password(db, current_user.get_uuid(), password_change)
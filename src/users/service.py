@@ -1,5 +1,6 @@
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .schemas import UserResponse, PasswordChangeRequest
 from .models import User
 from src.exceptions import (
@@ -10,11 +11,15 @@ from src.exceptions import (
 from src.auth.service import verify_password, get_password_hash
 import logging
 
+logger = logging.getLogger(__name__)
 
-def get_user_by_id(db: Session, user_id: UUID) -> UserResponse:
-    user = db.query(User).filter(User.id == user_id).first()
+
+async def get_user_by_id(db: AsyncSession, user_id: UUID) -> UserResponse:
+    user = (
+        await db.execute(select(User).where(User.id == user_id))
+    ).scalar_one_or_none()
     if not user:
-        logging.warning(f"User with id {user_id} not found")
+        logger.warning("User with id %s not found", user_id)
         raise UserNotFoundError(f"User with id {user_id} not found")
     return UserResponse(
         id=user.id,
@@ -25,33 +30,35 @@ def get_user_by_id(db: Session, user_id: UUID) -> UserResponse:
     )
 
 
-def change_password(
-    db: Session, user_id: UUID, password_change: PasswordChangeRequest
+async def change_password(
+    db: AsyncSession, user_id: UUID, password_change: PasswordChangeRequest
 ) -> None:
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = (
+            await db.execute(select(User).where(User.id == user_id))
+        ).scalar_one_or_none()
         if not user:
-            logging.warning(f"User with id {user_id} not found")
+            logger.warning("User with id %s not found", user_id)
             raise UserNotFoundError(f"User with id {user_id} not found")
 
         # Verify current password
-        if not verify_password(password_change.current_password, user.password):
-            logging.warning(f"Invalid current password for user {user_id}")
+        if not await verify_password(password_change.current_password, user.password):
+            logger.warning("Invalid current password for user %s", user_id)
             raise InvalidPasswordError(f"Invalid current password for user {user_id}")
 
         # Verify new password
         if password_change.new_password != password_change.new_password_confirm:
-            logging.warning(
-                f"New password and confirm password do not match for user {user_id}"
+            logger.warning(
+                "New password and confirm password do not match for user %s", user_id
             )
             raise PasswordMismatchError(
                 f"New password and confirm password do not match for user {user_id}"
             )
 
         # Update password
-        user.password = get_password_hash(password_change.new_password)
-        db.commit()
-        logging.info(f"Password changed successfully for user {user_id}")
+        user.password = await get_password_hash(password_change.new_password)
+        await db.commit()
+        logger.info("Password changed successfully for user %s", user_id)
     except Exception as e:
-        logging.error(f"Error changing password for user {user_id}: {e}")
+        logger.error("Error changing password for user %s: %s", user_id, e)
         raise e
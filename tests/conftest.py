@@ -0,0 +1,110 @@
+import os
+import tempfile
+from uuid import UUID
+
+import pytest
+
+# Configured before anything imports src: the settings are read at import time
+_tmp = tempfile.mkdtemp(prefix="musicevent-tests-")
+_db_path = os.path.join(_tmp, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+os.environ["BLOB_STORAGE_PATH"] = os.path.join(_tmp, "blobs")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ["EVENT_BROKER_BACKEND"] = "memory"
+
+import fakeredis
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+from src.audios.models import Audio, AudioStatus
+from src.auth.schemas import TokenData
+from src.auth.service import get_current_user
+from src.core import redis as redis_clients
+from src.core.kafka import get_event_broker
+from src.database import models  # noqa: F401
+from src.database.database import (
+    Base,
+    SessionLocal,
+    async_engine,
+    engine,
+)
+from src.main import app
+
+TEST_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    sync_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(redis_clients, "_redis_client", client)
+    monkeypatch.setattr(redis_clients, "_sync_redis_client", sync_client)
+    return sync_client
+
+
+@pytest.fixture
+def event_broker():
+    broker = get_event_broker()
+    broker.clear()
+    yield broker
+    broker.clear()
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: TokenData(user_id=TEST_USER_ID)
+    # Not entered as a context manager: the lifespan would warm up real pools
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def upload_audio(client, monkeypatch):
+    # Leaves the processing task in the outbox instead of sending it to Celery
+    from src.outbox import tasks as outbox_tasks
+
+    monkeypatch.setattr(outbox_tasks, "kick_dispatcher", lambda: None)
+
+    def upload(name: str = "set", data: bytes = b"audio", processed=False) -> dict:
+        response = client.post(
+            "/audios/",
+            data={"name": name},
+            files={"file": ("set.mp3", data, "audio/mpeg")},
+        )
+        assert response.status_code == 200, response.text
+        audio = response.json()
+        if processed:
+            # Only processed audios can be attached to events
+            with SessionLocal() as db:
+                db.execute(
+                    update(Audio)
+                    .where(Audio.id == UUID(audio["id"]))
+                    .values(status=AudioStatus.PROCESSED)
+                )
+                db.commit()
+        return audio
+
+    return upload
+
+
+@pytest.fixture
+def captured_sql():
+    # Every statement the API sends to the database while the test runs
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
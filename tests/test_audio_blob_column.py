@@ -0,0 +1,33 @@
+import re
+
+import pytest
+
+# audios.file, also when aliased (audios_1.file)
+SELECTS_FILE = re.compile(r"\baudios(_\d+)?\.file\b")
+
+
+@pytest.fixture
+def event_with_audios(client, upload_audio):
+    audio_ids = [upload_audio(f"set {i}", processed=True)["id"] for i in range(3)]
+    response = client.post("/events/", json={"name": "night", "audio_ids": audio_ids})
+    assert response.status_code == 200, response.text
+    return response.json()["id"], audio_ids
+
+
+def test_metadata_endpoints_never_select_the_blob_column(
+    client, event_with_audios, captured_sql
+):
+    event_id, audio_ids = event_with_audios
+
+    for path in (
+        "/audios/",
+        f"/audios/{audio_ids[0]}",
+        "/events/",
+        f"/events/{event_id}",
+    ):
+        captured_sql.clear()
+        assert client.get(path).status_code == 200, path
+        selects = [sql for sql in captured_sql if sql.lstrip().startswith("SELECT")]
+        # Built from the database, not served from a cache
+        assert selects, path
+        assert not [sql for sql in selects if SELECTS_FILE.search(sql)], path
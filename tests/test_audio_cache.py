@@ -0,0 +1,49 @@
+import pytest
+
+
+def _items(client, path: str) -> list[dict]:
+    response = client.get(path)
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+def _names(client, path: str) -> list[str]:
+    return [audio["name"] for audio in _items(client, path)]
+
+
+def test_upload_invalidates_the_cached_listing(client, upload_audio):
+    upload_audio("first")
+    assert _names(client, "/audios/") == ["first"]
+
+    upload_audio("second")
+
+    assert _names(client, "/audios/") == ["second", "first"]
+
+
+def test_attaching_invalidates_the_cached_detail_and_listing(client, upload_audio):
+    audio_id = upload_audio("set", processed=True)["id"]
+    assert client.get(f"/audios/{audio_id}").json()["event_id"] is None
+    assert _items(client, "/audios/")[0]["event_id"] is None
+
+    event_id = client.post(
+        "/events/", json={"name": "night", "audio_ids": [audio_id]}
+    ).json()["id"]
+
+    assert client.get(f"/audios/{audio_id}").json()["event_id"] == event_id
+    assert _items(client, "/audios/")[0]["event_id"] == event_id
+    assert _names(client, f"/audios/?event_id={event_id}") == ["set"]
+
+
+@pytest.mark.parametrize("path", ["/audios/", "/audios/{audio_id}"])
+def test_cached_etag_is_answered_without_the_database(
+    client, upload_audio, captured_sql, path
+):
+    path = path.format(audio_id=upload_audio()["id"])
+    etag = client.get(path).headers["ETag"]
+    captured_sql.clear()
+
+    response = client.get(path, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert captured_sql == []
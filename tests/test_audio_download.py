@@ -0,0 +1,84 @@
+import hashlib
+
+import pytest
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def download(client, upload_audio):
+    audio_id = upload_audio(data=DATA)["id"]
+
+    def get(**headers: str):
+        return client.get(f"/audios/{audio_id}/download", headers=headers)
+
+    return get
+
+
+def test_full_download(download):
+    response = download()
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["ETag"] == f'"{hashlib.sha256(DATA).hexdigest()}"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Content-Length"] == str(len(DATA))
+
+
+@pytest.mark.parametrize(
+    ("range_header", "start", "end"),
+    [
+        ("bytes=10-19", 10, 19),
+        ("bytes=-100", len(DATA) - 100, len(DATA) - 1),
+        ("bytes=1000-", 1000, len(DATA) - 1),
+        # Past the end: clamped to the last byte
+        ("bytes=1000-5000", 1000, len(DATA) - 1),
+    ],
+)
+def test_range(download, range_header, start, end):
+    response = download(Range=range_header)
+
+    assert response.status_code == 206
+    assert response.content == DATA[start : end + 1]
+    assert response.headers["Content-Range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response.headers["Content-Length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("range_header", ["bytes=5000-", "bytes=20-10", "bytes=-0"])
+def test_unsatisfiable_range(download, range_header):
+    response = download(Range=range_header)
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize(
+    "range_header", ["bytes=a-b", "items=0-10", "bytes=0-1,5-6", "bytes=10"]
+)
+def test_malformed_range_is_ignored(download, range_header):
+    response = download(Range=range_header)
+
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_range_with_a_stale_if_range_returns_the_whole_file(download):
+    etag = download().headers["ETag"]
+
+    assert download(Range="bytes=0-9", **{"If-Range": etag}).status_code == 206
+    response = download(Range="bytes=0-9", **{"If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_not_modified(download):
+    first = download()
+
+    by_etag = download(**{"If-None-Match": first.headers["ETag"]})
+    by_date = download(**{"If-Modified-Since": first.headers["Last-Modified"]})
+
+    for response in (by_etag, by_date):
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == first.headers["ETag"]
+    assert download(**{"If-None-Match": '"other"'}).status_code == 200
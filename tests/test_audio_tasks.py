@@ -0,0 +1,141 @@
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select, update
+
+from src.audios import tasks
+from src.audios.models import Audio, AudioStatus, TrackPlay
+from src.database.database import SessionLocal, engine
+from src.fingerprints import index, pipeline
+from src.fingerprints.models import ReferenceTrack
+from src.fingerprints.pipeline import IdentifiedPlay
+from src.outbox.models import OutboxEvent, OutboxMessage
+
+
+def _set_processing(audio_id: str, lease_owner: str, **values) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(Audio)
+            .where(Audio.id == UUID(audio_id))
+            .values(status=AudioStatus.PROCESSING, lease_owner=lease_owner, **values)
+        )
+        db.commit()
+
+
+def test_segment_holds_no_connection_while_identifying(upload_audio, monkeypatch):
+    audio_id = upload_audio()["id"]
+    _set_processing(audio_id, "task-1", segments_total=2, segments_done=0)
+
+    checked_out = []
+
+    def identify(source, fingerprint_index, start_seconds, duration_seconds):
+        checked_out.append(engine.pool.checkedout())
+        return [], start_seconds + 600
+
+    monkeypatch.setattr(pipeline, "identify", identify)
+    monkeypatch.setattr(index, "get_fingerprint_index", lambda: None)
+
+    assert tasks.process_audio_segment(audio_id, 0.0, 600.0, "task-1") == []
+
+    assert checked_out == [0]
+    with SessionLocal() as db:
+        assert (
+            db.execute(
+                select(Audio.segments_done).where(Audio.id == UUID(audio_id))
+            ).scalar_one()
+            == 1
+        )
+
+
+def test_rerunning_a_segment_upserts_its_track_plays(upload_audio):
+    audio_id = upload_audio()["id"]
+    with SessionLocal() as db:
+        db.add_all(
+            ReferenceTrack(
+                id=track_id,
+                artist="Artist",
+                title=title,
+                duration=180.0,
+                sha256=str(track_id) * 64,
+            )
+            for track_id, title in ((1, "One"), (2, "Two"))
+        )
+        db.commit()
+    plays = [
+        asdict(IdentifiedPlay(1, 0.0, 0.0, 180.0, [40.0])),
+        asdict(IdentifiedPlay(2, 180.0, 180.0, 360.0, [30.0])),
+    ]
+
+    def finalize(lease_owner: str, segment_plays: list[dict]) -> list[tuple]:
+        _set_processing(audio_id, lease_owner, segments_total=1, segments_done=0)
+        tasks.finalize_audio([segment_plays], audio_id, lease_owner)
+        with SessionLocal() as db:
+            return db.execute(
+                select(TrackPlay.title, TrackPlay.start_offset)
+                .where(TrackPlay.audio_id == UUID(audio_id))
+                .order_by(TrackPlay.start_offset)
+            ).all()
+
+    assert finalize("task-1", plays) == [("One", 0.0), ("Two", 180.0)]
+    # A redelivered run writes the same rows again, not a second copy
+    assert finalize("task-2", plays) == [("One", 0.0), ("Two", 180.0)]
+    # Rows the latest run no longer finds are removed
+    assert finalize("task-3", plays[1:]) == [("Two", 180.0)]
+
+
+@pytest.mark.parametrize(
+    ("attempts", "status", "messages", "failed_events"),
+    [
+        (1, AudioStatus.PENDING, 2, 0),
+        # Out of attempts: failed, never requeued again
+        (tasks.PROCESSING_MAX_ATTEMPTS, AudioStatus.FAILED, 1, 1),
+    ],
+)
+def test_expired_lease_is_requeued_until_out_of_attempts(
+    upload_audio, attempts, status, messages, failed_events
+):
+    audio_id = upload_audio()["id"]
+    _set_processing(
+        audio_id,
+        "dead-worker",
+        lease_expires_at=datetime.now() - timedelta(seconds=1),
+        processing_attempts=attempts,
+    )
+
+    result = tasks.requeue_expired_leases()
+
+    assert result == {
+        "requeued": int(status == AudioStatus.PENDING),
+        "failed": int(status == AudioStatus.FAILED),
+    }
+    with SessionLocal() as db:
+        audio = db.get(Audio, UUID(audio_id))
+        assert (audio.status, audio.lease_owner) == (status, None)
+        # The upload's message, plus one per requeue
+        assert (
+            db.scalars(select(OutboxMessage.args)).all().count([audio_id]) == messages
+        )
+        assert (
+            db.scalars(select(OutboxEvent.type)).all().count("audio.failed")
+            == failed_events
+        )
+
+
+def test_live_lease_is_left_alone(upload_audio):
+    audio_id = upload_audio()["id"]
+    _set_processing(
+        audio_id,
+        "live-worker",
+        lease_expires_at=datetime.now() + timedelta(minutes=1),
+        processing_attempts=1,
+    )
+
+    assert tasks.requeue_expired_leases() == {"requeued": 0, "failed": 0}
+    with SessionLocal() as db:
+        audio = db.get(Audio, UUID(audio_id))
+        assert (audio.status, audio.lease_owner) == (
+            AudioStatus.PROCESSING,
+            "live-worker",
+        )
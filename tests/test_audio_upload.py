@@ -0,0 +1,35 @@
+import hashlib
+from pathlib import Path
+from uuid import UUID
+
+from src.audios.models import Audio
+from src.core.storage import get_blob_storage
+from src.database.database import SessionLocal
+
+
+def _stored_blobs() -> list[Path]:
+    root = get_blob_storage().root
+    return [
+        path
+        for path in root.rglob("*")
+        if path.is_file() and root / "tmp" not in path.parents
+    ]
+
+
+def test_identical_uploads_share_one_blob(client, upload_audio):
+    data = b"the same set, uploaded twice"
+    before = set(_stored_blobs())
+
+    audio_ids = [upload_audio(name, data)["id"] for name in ("first", "second")]
+
+    assert audio_ids[0] != audio_ids[1]
+    sha256 = hashlib.sha256(data).hexdigest()
+    with SessionLocal() as db:
+        audios = [db.get(Audio, UUID(audio_id)) for audio_id in audio_ids]
+    assert [(audio.blob_key, audio.size_bytes) for audio in audios] == [
+        (sha256, len(data))
+    ] * 2
+    new_blobs = set(_stored_blobs()) - before
+    assert [blob.name for blob in new_blobs] == [sha256]
+    for audio_id in audio_ids:
+        assert client.get(f"/audios/{audio_id}/download").content == data
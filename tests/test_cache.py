@@ -0,0 +1,48 @@
+from prometheus_client import REGISTRY
+
+from src.core import cache
+
+
+def _lookups() -> dict[tuple[str, str], float]:
+    return {
+        (layer, result): REGISTRY.get_sample_value(
+            "cache_requests_total", {"layer": layer, "result": result}
+        )
+        or 0.0
+        for layer in ("l1", "l2")
+        for result in ("hit", "miss")
+    }
+
+
+def test_lookups_are_counted_per_layer(client, monkeypatch):
+    monkeypatch.setattr(cache, "_local_cache_enabled", True)
+    cache.local_cache.clear()
+
+    def lookups_after_get() -> dict[tuple[str, str], float]:
+        before = _lookups()
+        assert client.get("/audios/").status_code == 200
+        return {key: count - before[key] for key, count in _lookups().items()}
+
+    assert lookups_after_get() == {
+        ("l1", "hit"): 0,
+        ("l1", "miss"): 1,
+        ("l2", "hit"): 0,
+        ("l2", "miss"): 1,
+    }
+    assert lookups_after_get() == {
+        ("l1", "hit"): 1,
+        ("l1", "miss"): 0,
+        ("l2", "hit"): 0,
+        ("l2", "miss"): 0,
+    }
+    assert REGISTRY.get_sample_value("l1_cache_entries") == 1
+    assert REGISTRY.get_sample_value("l1_cache_bytes") > 0
+
+    cache.local_cache.clear()
+    assert REGISTRY.get_sample_value("l1_cache_entries") == 0
+    assert lookups_after_get() == {
+        ("l1", "hit"): 0,
+        ("l1", "miss"): 1,
+        ("l2", "hit"): 1,
+        ("l2", "miss"): 0,
+    }
@@ -0,0 +1,65 @@
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from src.audios.models import Audio
+from src.database.database import SessionLocal
+from src.events.models import Event
+
+
+def _create_event(client, name: str, audio_ids: list[str]):
+    return client.post("/events/", json={"name": name, "audio_ids": audio_ids})
+
+
+@pytest.fixture
+def unattachable(client, upload_audio) -> dict[str, str]:
+    attached = upload_audio("attached", processed=True)["id"]
+    assert _create_event(client, "earlier", [attached]).status_code == 200
+    return {
+        "not found": str(uuid4()),
+        "not processed yet": upload_audio("pending")["id"],
+        "already attached to an event": attached,
+    }
+
+
+@pytest.mark.parametrize(
+    "reasons",
+    [
+        ["not found"],
+        ["not processed yet"],
+        ["already attached to an event"],
+        ["not found", "not processed yet", "already attached to an event"],
+    ],
+)
+def test_unattachable_audios_reject_the_whole_event(
+    client, upload_audio, unattachable, reasons
+):
+    attachable = upload_audio("attachable", processed=True)["id"]
+
+    response = _create_event(
+        client, "night", [attachable] + [unattachable[reason] for reason in reasons]
+    )
+
+    assert response.status_code == 400
+    message = response.json()["message"]
+    for reason in reasons:
+        assert f"{reason}: {unattachable[reason]}" in message
+    assert attachable not in message
+    with SessionLocal() as db:
+        # Neither the event nor any of its attachments were kept
+        assert db.get(Audio, UUID(attachable)).event_id is None
+        assert db.scalar(select(func.count()).select_from(Event)) == 1
+
+
+def test_attaches_processed_audios(client, upload_audio):
+    audio_ids = [upload_audio(f"set {i}", processed=True)["id"] for i in range(2)]
+
+    response = _create_event(client, "night", audio_ids + audio_ids[:1])
+
+    assert response.status_code == 200, response.text
+    event = response.json()
+    assert event["audio_ids"] == audio_ids
+    with SessionLocal() as db:
+        for audio_id in audio_ids:
+            assert str(db.get(Audio, UUID(audio_id)).event_id) == event["id"]
@@ -0,0 +1,30 @@
+from src.fingerprints import benchmark
+from src.fingerprints.index import FingerprintIndex, current_version, prune_versions
+from src.fingerprints.pipeline import identify_windows
+
+
+def test_identifies_tracks_played_back_to_back(monkeypatch):
+    monkeypatch.setattr(benchmark, "TRACK_SECONDS", 40.0)
+    index = benchmark._catalogue(3)
+
+    plays, audio_seconds = identify_windows(benchmark._windows(3, 120.0), index)
+
+    assert audio_seconds == 120.0
+    assert [play.track_id for play in plays] == [1, 2, 3]
+    for position, play in enumerate(plays):
+        assert abs(play.start_offset - 40.0 * position) <= 5.0
+
+
+def test_pruning_keeps_the_current_and_previous_versions(tmp_path):
+    index = benchmark._catalogue(1)
+    for version in ("1", "2", "3"):
+        previous = current_version(str(tmp_path))
+        index.save(str(tmp_path), version)
+        prune_versions(str(tmp_path), {version, previous})
+
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_dir()) == [
+        "2",
+        "3",
+    ]
+    assert current_version(str(tmp_path)) == "3"
+    assert len(FingerprintIndex.open(str(tmp_path)).keys) == len(index.keys)
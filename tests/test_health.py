@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from src.core import admission, health
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    # Every probe runs the checks again, with a reachable broker by default
+    monkeypatch.setattr(health, "HEALTH_CHECK_CACHE_SECONDS", 0)
+    monkeypatch.setattr(health, "_ping_broker", lambda: None)
+    return health._checks
+
+
+def test_ready_when_every_dependency_answers(client, checks):
+    response = client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+    assert set(response.json()["checks"]) == {"database", "redis", "broker"}
+
+
+def test_not_ready_when_the_broker_is_down(client, checks, monkeypatch):
+    def ping_broker():
+        raise ConnectionRefusedError("connection refused")
+
+    monkeypatch.setattr(health, "_ping_broker", ping_broker)
+
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "unavailable"
+    assert body["checks"]["broker"]["ok"] is False
+    assert "ConnectionRefusedError" in body["checks"]["broker"]["error"]
+    assert body["checks"]["database"]["ok"] is True
+    # Liveness does not depend on the broker
+    assert client.get("/healthz").status_code == 200
+
+
+def test_not_ready_when_the_database_hangs(client, checks, monkeypatch):
+    async def hang():
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(health, "HEALTH_CHECK_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(checks["database"], "check", hang)
+
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    database = response.json()["checks"]["database"]
+    assert database["ok"] is False
+    assert database["error"] == "timed out after 0.05s"
+
+
+def test_sheds_requests_while_the_db_pool_is_saturated(client, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_MAX_DB_POOL_WAIT_SECONDS", 0.1)
+    monkeypatch.setattr(admission, "_db_pool_wait_seconds", lambda: 0.5)
+
+    response = client.get("/audios/")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        admission.ADMISSION_RETRY_AFTER_SECONDS
+    )
+    # Probes are exempt: they are how the overload is seen
+    assert client.get("/healthz").status_code == 200
+
+
+def test_sheds_requests_past_the_in_flight_limit(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_MAX_IN_FLIGHT", 2)
+    middleware = admission.AdmissionControlMiddleware(PlainTextResponse("ok"))
+    client = TestClient(middleware)
+
+    assert client.get("/").status_code == 200
+    middleware.in_flight = 2
+    response = client.get("/")
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert client.get("/readyz").status_code == 200
@@ -0,0 +1,32 @@
+import pytest
+
+
+def _count_selects(client, captured_sql, redis, path: str) -> int:
+    # Cold cache: the page is built from the database
+    redis.flushall()
+    captured_sql.clear()
+    response = client.get(path)
+    assert response.status_code == 200, response.text
+    return sum(1 for sql in captured_sql if sql.lstrip().startswith("SELECT"))
+
+
+@pytest.mark.parametrize("path", ["/events/?limit=50", "/audios/?limit=50"])
+def test_list_query_count_does_not_grow_with_the_page(
+    client, upload_audio, captured_sql, redis, path
+):
+    def add_events(count: int) -> None:
+        for i in range(count):
+            audio_ids = [
+                upload_audio(f"set {i}.{j}", processed=True)["id"] for j in range(2)
+            ]
+            response = client.post(
+                "/events/", json={"name": f"night {i}", "audio_ids": audio_ids}
+            )
+            assert response.status_code == 200, response.text
+
+    add_events(2)
+    small = _count_selects(client, captured_sql, redis, path)
+    add_events(8)
+    large = _count_selects(client, captured_sql, redis, path)
+
+    assert 0 < large == small
@@ -0,0 +1,63 @@
+import os
+from uuid import uuid4
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from src.database.database import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), os.pardir, "alembic.ini")
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _migrate(engine, revision: str) -> None:
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def test_migrations_match_the_models(scratch_engine):
+    # Fails when a model changes without a migration
+    _migrate(scratch_engine, "head")
+    with scratch_engine.connect() as connection:
+        # SQLite has no UUID type to compare against
+        context = MigrationContext.configure(connection, opts={"compare_type": False})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_upgrade_keeps_legacy_audio_bytes(scratch_engine):
+    _migrate(scratch_engine, "0001")
+    audio_id = uuid4().hex
+    with scratch_engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO audios (id, name, status, file)"
+                " VALUES (:id, 'legacy', 'PROCESSED', :file)"
+            ),
+            {"id": audio_id, "file": b"legacy bytes"},
+        )
+
+    _migrate(scratch_engine, "head")
+
+    with scratch_engine.connect() as connection:
+        row = connection.execute(
+            text(
+                "SELECT file, blob_key, segments_done, processing_attempts"
+                " FROM audios WHERE id = :id"
+            ),
+            {"id": audio_id},
+        ).one()
+    assert row.file == b"legacy bytes"
+    assert row.blob_key is None
+    assert (row.segments_done, row.processing_attempts) == (0, 0)
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from src.database.database import SessionLocal
+from src.outbox import tasks
+from src.outbox.models import OutboxMessage
+
+
+def _message() -> OutboxMessage | None:
+    with SessionLocal() as db:
+        return db.scalars(select(OutboxMessage)).one_or_none()
+
+
+def _make_available() -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(OutboxMessage).values(
+                available_at=datetime.now() - timedelta(seconds=1)
+            )
+        )
+        db.commit()
+
+
+def test_failed_sends_back_off_then_succeed(upload_audio, monkeypatch):
+    audio_id = upload_audio()["id"]
+    sent = []
+
+    def send_task(name, args, task_id):
+        if len(sent) < 2:
+            sent.append(None)
+            raise ConnectionError("broker down")
+        sent.append((name, args, task_id))
+
+    monkeypatch.setattr(tasks.celery_app, "send_task", send_task)
+
+    before = datetime.now()
+    assert tasks.dispatch_outbox() == {"dispatched": 0, "failed": 1}
+    message = _message()
+    assert message.attempts == 1
+    assert message.last_error == "broker down"
+    assert message.available_at >= before + timedelta(seconds=1)
+    # Not retried before its backoff is over
+    assert tasks.dispatch_outbox() == {"dispatched": 0, "failed": 0}
+
+    _make_available()
+    before = datetime.now()
+    assert tasks.dispatch_outbox() == {"dispatched": 0, "failed": 1}
+    message = _message()
+    assert message.attempts == 2
+    assert message.available_at >= before + timedelta(seconds=2)
+
+    _make_available()
+    assert tasks.dispatch_outbox() == {"dispatched": 1, "failed": 0}
+    assert sent[-1] == ("src.audios.tasks.process_audio", [audio_id], str(message.id))
+    assert _message() is None
@@ -0,0 +1,88 @@
+from sqlalchemy import func, select
+
+from src.core.kafka import AUDIOS_TOPIC, EVENTS_TOPIC, InMemoryEventBroker
+from src.database.database import SessionLocal
+from src.outbox import service as outbox
+from src.outbox import tasks
+from src.outbox.models import OutboxEvent
+
+
+def _outbox_size() -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(OutboxEvent)).scalar_one()
+
+
+class FailingKeyBroker(InMemoryEventBroker):
+    # Rejects every record of one key, accepts the rest
+    def __init__(self, failing_key: str):
+        super().__init__()
+        self.failing_key = failing_key
+
+    def publish(self, records):
+        accepted = [record for record in records if record.key != self.failing_key]
+        super().publish(accepted)
+        return [
+            ConnectionError("broker down") if record.key == self.failing_key else None
+            for record in records
+        ]
+
+
+def test_publishes_committed_events_then_deletes_them(
+    client, upload_audio, event_broker
+):
+    audio_ids = [upload_audio(f"set {i}", processed=True)["id"] for i in range(2)]
+    event_id = client.post(
+        "/events/", json={"name": "night", "audio_ids": audio_ids}
+    ).json()["id"]
+
+    assert tasks.publish_outbox_events() == {"published": 5, "failed": 0}
+
+    # Each audio's events in the order they happened
+    audio_messages = event_broker.messages(AUDIOS_TOPIC)
+    for audio_id in audio_ids:
+        assert [
+            m["type"] for m in audio_messages if m["data"]["audio_id"] == audio_id
+        ] == ["audio.created", "audio.attached"]
+    assert [
+        (m["type"], m["data"]["event_id"]) for m in event_broker.messages(EVENTS_TOPIC)
+    ] == [("event.created", event_id)]
+    assert _outbox_size() == 0
+
+
+def test_failed_key_keeps_its_later_events_in_order(upload_audio, monkeypatch):
+    failing, healthy = upload_audio("failing")["id"], upload_audio("healthy")["id"]
+    with SessionLocal() as db:
+        outbox.record_event(
+            db, AUDIOS_TOPIC, "audio.failed", failing, {"audio_id": failing}
+        )
+        db.commit()
+    broker = FailingKeyBroker(failing)
+    monkeypatch.setattr(tasks, "get_event_broker", lambda: broker)
+
+    assert tasks.publish_outbox_events() == {"published": 1, "failed": 1}
+
+    assert [m["data"]["audio_id"] for m in broker.messages()] == [healthy]
+    with SessionLocal() as db:
+        kept = db.execute(
+            select(OutboxEvent.type, OutboxEvent.attempts).order_by(
+                OutboxEvent.created_at
+            )
+        ).all()
+    # The event that failed and the one queued behind it on the same key
+    assert [tuple(row) for row in kept] == [("audio.created", 1), ("audio.failed", 0)]
+
+
+def test_expired_publisher_lock_is_not_an_error(upload_audio, redis, monkeypatch):
+    upload_audio()
+
+    class SlowBroker(InMemoryEventBroker):
+        def publish(self, records):
+            # The lock times out while the batch is being sent
+            redis.delete(tasks.OUTBOX_EVENTS_LOCK_KEY)
+            return super().publish(records)
+
+    broker = SlowBroker()
+    monkeypatch.setattr(tasks, "get_event_broker", lambda: broker)
+
+    assert tasks.publish_outbox_events() == {"published": 1, "failed": 0}
+    assert len(broker.records) == 1
@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.auth import service
+
+
+def _register(client, email: str):
+    return client.post(
+        "/auth/register",
+        json={
+            "email": email,
+            "first_name": "Test",
+            "last_name": "User",
+            "password": "correct horse battery staple",
+        },
+    )
+
+
+def test_full_hashing_queue_sheds_with_503(client, monkeypatch):
+    release = threading.Event()
+
+    def slow_hash(password: str) -> str:
+        release.wait(timeout=10)
+        return "hashed"
+
+    monkeypatch.setattr(service, "PASSWORD_HASH_MAX_PENDING", 1)
+    monkeypatch.setattr(service.bcrypt_context, "hash", slow_hash)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(_register, client, "first@example.com")
+        deadline = time.monotonic() + 5
+        while service._password_jobs_pending < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        rejected = _register(client, "second@example.com")
+        release.set()
+
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == str(
+            service.PASSWORD_HASH_RETRY_AFTER_SECONDS
+        )
+        assert first.result().status_code == 201
+    # Slots are given back once the jobs finish
+    assert _register(client, "third@example.com").status_code == 201
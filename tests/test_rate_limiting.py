@@ -0,0 +1,61 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src import rate_limiting
+from src.auth.tokens import get_token_verifier
+from src.rate_limiting import RateLimit
+
+
+@pytest.fixture
+def rate_limits(monkeypatch):
+    limits = dict(rate_limiting.RATE_LIMITS)
+    monkeypatch.setattr(rate_limiting, "RATE_LIMITS", limits)
+    return limits
+
+
+def test_parse_rate_limit():
+    assert RateLimit.parse("5/second") == RateLimit(5, 1, "user")
+    assert RateLimit.parse("10/minutes by ip") == RateLimit(10, 60, "ip")
+    with pytest.raises(ValueError):
+        RateLimit.parse("10/minute by route")
+
+
+def test_table_applies_to_routes_without_their_own_dependency(client, rate_limits):
+    rate_limits["GET /audios/"] = RateLimit.parse("2/minute")
+
+    responses = [client.get("/audios/") for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    # Returned as a prebuilt Response from the cache, headers included
+    assert responses[0].headers["RateLimit-Limit"] == "2"
+    assert responses[0].headers["RateLimit-Remaining"] == "1"
+    assert responses[0].headers["RateLimit-Policy"] == "2;w=60"
+    assert "Retry-After" in responses[2].headers
+
+
+def test_routes_missing_from_the_table_are_not_limited(client, rate_limits):
+    rate_limits.pop("GET /events/", None)
+
+    response = client.get("/events/")
+
+    assert response.status_code == 200
+    assert "RateLimit-Limit" not in response.headers
+
+
+def test_users_are_limited_separately_from_their_ip(client, rate_limits):
+    rate_limits["GET /events/"] = RateLimit.parse("1/minute by user")
+    expires_at = datetime.now(UTC) + timedelta(minutes=5)
+    tokens = [
+        get_token_verifier().encode({"id": user_id, "exp": expires_at})
+        for user_id in ("user-a", "user-b")
+    ]
+
+    def get_events(token):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return client.get("/events/", headers=headers).status_code
+
+    assert [get_events(token) for token in tokens] == [200, 200]
+    assert get_events(tokens[0]) == 429
+    # Anonymous requests share the IP's bucket
+    assert [get_events(None), get_events(None)] == [200, 429]
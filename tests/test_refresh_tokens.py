@@ -0,0 +1,46 @@
+import pytest
+
+from src.auth import token_store
+
+
+@pytest.fixture(params=["sql", "redis"])
+def refresh_token(request, client, monkeypatch):
+    monkeypatch.setattr(token_store, "REFRESH_TOKEN_STORE", request.param)
+    response = client.post(
+        "/auth/register",
+        json={
+            "email": "dj@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+            "password": "correct horse battery staple",
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.cookies["refresh_token"]
+
+
+def _refresh(client, refresh_token: str):
+    client.cookies.clear()
+    client.cookies.set("refresh_token", refresh_token)
+    return client.post("/auth/refresh")
+
+
+def test_refresh_token_rotates_once(client, refresh_token):
+    response = _refresh(client, refresh_token)
+
+    assert response.status_code == 200
+    rotated = response.cookies["refresh_token"]
+    assert rotated != refresh_token
+    assert _refresh(client, rotated).status_code == 200
+
+
+def test_reusing_a_rotated_token_revokes_the_family(client, refresh_token):
+    rotated = _refresh(client, refresh_token).cookies["refresh_token"]
+
+    assert _refresh(client, refresh_token).status_code == 401
+    # The replacement was revoked with the rest of the user's tokens
+    assert _refresh(client, rotated).status_code == 401
+
+
+def test_unknown_refresh_token_is_rejected(client, refresh_token):
+    assert _refresh(client, refresh_token[::-1]).status_code == 401
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+
+from src.auth.tokens import TokenVerifier
+
+SECRET = "test-secret-of-at-least-32-bytes!"
+
+
+def _claims(user_id: int) -> dict:
+    return {
+        "id": str(user_id),
+        "exp": datetime.now(UTC) + timedelta(minutes=5),
+    }
+
+
+def test_tokens_signed_with_a_rotated_out_key_still_verify():
+    old = TokenVerifier({"old": SECRET}, "old", "HS256")
+    token = old.encode(_claims(1))
+    rotated = TokenVerifier({"new": SECRET[::-1], "old": SECRET}, "new", "HS256")
+
+    assert rotated.verify(token).user_id == "1"
+
+
+def test_concurrent_verification_with_a_full_cache():
+    # Hits, expirations and evictions racing on a cache smaller than the
+    # working set must never surface as errors
+    verifier = TokenVerifier({"k": SECRET}, "k", "HS256", cache_size=4)
+    tokens = [verifier.encode(_claims(i)) for i in range(16)]
+
+    def verify_all(offset: int) -> list[str]:
+        return [
+            verifier.verify(tokens[(offset + i) % len(tokens)]).user_id
+            for i in range(200)
+        ]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(verify_all, range(8)))
+
+    for offset, user_ids in enumerate(results):
+        assert user_ids == [str((offset + i) % len(tokens)) for i in range(200)]
+    assert len(verifier._verified) <= 4